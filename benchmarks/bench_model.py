@@ -0,0 +1,47 @@
+"""Benchmark training and batch inference of the investment classifier.
+
+Usage::
+
+    python -m benchmarks.bench_model                   # 10,000 tickers x 5 years
+    python -m benchmarks.bench_model --tickers 2000 --years 20 --cv 0
+
+The training table is scored from a synthetic BCTC panel (see
+``benchmarks.synthetic``), so it has every feature and label the model
+uses; inference is timed over the whole table in one batch.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_bctc
+from core.classifier import predict, train
+from core.scoring import compute_ratios, score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cv", type=int, default=0, help="cross-validation folds during training")
+    args = parser.parse_args(argv)
+
+    health = score(compute_ratios(synthetic_bctc(args.tickers, args.years)))
+    print(f"panel: {len(health):,} ticker-years")
+
+    start = time.perf_counter()
+    entry = train(health, args.cv)
+    print(f"{'train':>15}: {time.perf_counter() - start:.3f}s ({entry['rows']:,} labelled rows)")
+    if entry["cv_accuracy"] is not None:
+        print(f"{'cv accuracy':>15}: {entry['cv_accuracy']:.1%}")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        predict(entry, health)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{'inference':>15}: best {best:.3f}s of {args.repeat} ({len(health) / best:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
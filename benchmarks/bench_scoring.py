@@ -0,0 +1,43 @@
+"""Benchmark the health-score engine on a synthetic BCTC panel.
+
+Usage::
+
+    python -m benchmarks.bench_scoring                 # 10,000 tickers x 5 years
+    python -m benchmarks.bench_scoring --tickers 2000 --years 20
+
+Statements come from ``benchmarks.synthetic``; only the shape of the
+panel matters for timing.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_bctc
+from core.scoring import compute_ratios, score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    bctc = synthetic_bctc(args.tickers, args.years)
+    print(f"panel: {len(bctc):,} ticker-years")
+
+    timings = {"compute_ratios": [], "score": []}
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        ratios = compute_ratios(bctc)
+        timings["compute_ratios"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        score(ratios)
+        timings["score"].append(time.perf_counter() - start)
+
+    for stage, values in timings.items():
+        print(f"{stage:>15}: best {min(values):.3f}s of {args.repeat}")
+
+
+if __name__ == "__main__":
+    main()
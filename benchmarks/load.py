@@ -0,0 +1,243 @@
+"""Multi-session load test of both dashboard pages through Streamlit's AppTest.
+
+Usage::
+
+    python -m benchmarks.load                          # 1, 4 and 8 sessions
+    python -m benchmarks.load --sessions 1 8 16 --steps 30 --output load.json
+    python -m benchmarks.load --record traces.json     # write the generated traces
+    python -m benchmarks.load --trace traces.json      # replay recorded traces
+
+Every session is an AppTest instance of one page replaying an interaction
+trace: sidebar filters, ticker switches and date ranges. The sessions of a
+level run in parallel threads of one process, so they share the
+process-wide caches exactly like sessions of one server do. Each level runs
+in a fresh process, which keeps peak RSS and cache hit rates per level
+comparable. Point DASHBOARD_DATA_DIR at a synthetic data set (see
+``benchmarks.synthetic``) to size hosts for a larger market.
+
+A trace is ``{"page": <script>, "steps": [step, ...]}``. A step names a
+widget (``"widget"`` plus ``"label"`` or ``"key"``) and optionally the
+``"value"`` to set; without one, a random valid value is drawn.
+"""
+import argparse
+import datetime as dt
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (trọng số, bước) – tỷ lệ thao tác của một phiên làm việc điển hình
+HOME_ACTIONS = [
+    (0.35, {"widget": "selectbox", "label": "**Chọn mã cổ phiếu để xem chi tiết**"}),
+    (0.10, {"widget": "date_input", "key": "start_date", "before": "end_date"}),
+    (0.10, {"widget": "date_input", "key": "end_date", "after": "start_date"}),
+    (0.10, {"widget": "selectbox", "label": "Năm"}),
+    (0.10, {"widget": "multiselect", "label": "Ngành"}),
+    (0.05, {"widget": "multiselect", "label": "Xếp hạng tín nhiệm"}),
+    (0.05, {"widget": "multiselect", "label": "Trạng thái dòng tiền"}),
+    (0.05, {"widget": "slider", "label": "Top N doanh nghiệp theo Health Score"}),
+    (0.10, {"widget": "select_slider", "label": "Số doanh nghiệp hiển thị", "choices": [20, 50, 100, 200, 500]}),
+]
+PAGE_ACTIONS = [
+    (0.7, {"widget": "selectbox", "key": "ticker_select"}),
+    (0.3, {"widget": "selectbox", "key": "year_select"}),
+]
+PAGES = {
+    "Home.py": HOME_ACTIONS,
+    "pages/Phan_loai_dau_tu.py": PAGE_ACTIONS,
+}
+
+
+def generate_traces(n_sessions, n_steps, seed=0):
+    """Random traces, alternating sessions between the pages."""
+    rng = np.random.default_rng(seed)
+    traces = []
+    for i in range(n_sessions):
+        page = list(PAGES)[i % len(PAGES)]
+        weights, steps = zip(*PAGES[page])
+        picks = rng.choice(len(steps), n_steps, p=np.array(weights) / sum(weights))
+        traces.append({"page": page, "steps": [dict(steps[k]) for k in picks]})
+    return traces
+
+
+def find_widget(at, step):
+    """The AppTest widget a step refers to."""
+    widgets = getattr(at, step["widget"])
+    if "key" in step:
+        return widgets(key=step["key"])
+    return next(w for w in widgets if w.label == step["label"])
+
+
+def random_date(rng, low, high):
+    """Uniform random date in [low, high]."""
+    span = max((high - low).days, 0)
+    return low + dt.timedelta(days=int(rng.integers(0, span + 1)))
+
+
+def apply_step(at, step, rng, date_bounds):
+    """Set the step's widget to its value (or a random valid one)."""
+    widget = find_widget(at, step)
+    value = step.get("value")
+    kind = step["widget"]
+
+    if kind == "selectbox":
+        if value is None:
+            return widget.select_index(int(rng.integers(len(widget.options))))
+        return widget.select(value)
+    if kind == "multiselect":
+        if value is None:
+            size = int(rng.integers(1, len(widget.options) + 1))
+            value = list(rng.choice(widget.options, size, replace=False))
+        return widget.set_value(value)
+    if kind == "slider":
+        if value is None:
+            value = int(rng.integers(widget.min, widget.max + 1))
+        return widget.set_value(value)
+    if kind == "select_slider":
+        if value is None:
+            value = step["choices"][int(rng.integers(len(step["choices"])))]
+        return widget.set_value(value)
+    if kind == "date_input":
+        if value is None:
+            low, high = date_bounds
+            if "before" in step:
+                high = at.date_input(key=step["before"]).value
+            if "after" in step:
+                low = at.date_input(key=step["after"]).value
+            value = random_date(rng, low, high)
+        elif isinstance(value, str):
+            value = dt.date.fromisoformat(value)
+        return widget.set_value(value)
+    raise ValueError(f"unknown widget kind: {kind}")
+
+
+def run_session(trace, seed, start, timeout):
+    """Replay one trace; return (first run seconds, rerun latencies, errors)."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(str(ROOT / trace["page"]), default_timeout=timeout)
+    start.wait()
+
+    t0 = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - t0
+
+    # Khoảng ngày hợp lệ = giá trị mặc định ban đầu của hai ô chọn ngày
+    dates = [w.value for w in at.date_input]
+    date_bounds = (min(dates), max(dates)) if dates else None
+
+    latencies, errors = [], [str(e.value) for e in at.exception]
+    for step in trace["steps"]:
+        t0 = time.perf_counter()
+        apply_step(at, step, rng, date_bounds).run()
+        latencies.append(time.perf_counter() - t0)
+        errors.extend(str(e.value) for e in at.exception)
+    return first, latencies, errors
+
+
+def run_level(traces, seed=0, timeout=300):
+    """Run all traces concurrently in this process; return the level report."""
+    from core import cachestats
+
+    cachestats.reset()
+    start = threading.Barrier(len(traces))
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(traces)) as pool:
+        futures = [
+            pool.submit(run_session, trace, seed + i, start, timeout)
+            for i, trace in enumerate(traces)
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - t0
+
+    firsts = [first for first, _, _ in results]
+    latencies = np.array([x for _, lat, _ in results for x in lat])
+    caches = cachestats.snapshot()
+
+    # process_data nằm trong st.cache_resource: mỗi lần chạy Home.py là một yêu cầu
+    home_runs = sum(len(t["steps"]) + 1 for t in traces if t["page"] == "Home.py")
+    if "master" in caches:
+        misses = caches["master"]["misses"]
+        caches["master"] = {
+            "hits": home_runs - misses,
+            "misses": misses,
+            "hit_rate": (home_runs - misses) / home_runs,
+        }
+
+    return {
+        "sessions": len(traces),
+        "reruns": int(latencies.size),
+        "elapsed_s": elapsed,
+        "reruns_per_s": latencies.size / elapsed if elapsed else None,
+        "first_run_s": {"p50": float(np.median(firsts)), "max": float(max(firsts))},
+        "rerun_s": {
+            f"p{q}": float(np.percentile(latencies, q)) if latencies.size else None
+            for q in (50, 95, 99)
+        } | {"max": float(latencies.max()) if latencies.size else None},
+        # ru_maxrss tính bằng KiB trên Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "cache": caches,
+        "errors": [e for _, _, errs in results for e in errs][:20],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--steps", type=int, default=20, help="interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--trace", type=Path, help="JSON list of traces to replay")
+    parser.add_argument("--record", type=Path, help="write the generated traces here")
+    parser.add_argument("--output", type=Path, default=Path("load_results.json"))
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    def traces_for(n):
+        if args.trace:
+            recorded = json.loads(args.trace.read_text())
+            return [recorded[i % len(recorded)] for i in range(n)]
+        return generate_traces(n, args.steps, args.seed)
+
+    # Tiến trình con: chạy một mức tải và in kết quả dạng JSON
+    if args.worker:
+        print(json.dumps(run_level(traces_for(args.worker), args.seed, args.timeout)))
+        return
+
+    if args.record:
+        args.record.write_text(json.dumps(traces_for(max(args.sessions)), ensure_ascii=False, indent=2))
+
+    levels = []
+    for n in args.sessions:
+        cmd = [sys.executable, "-m", "benchmarks.load", "--worker", str(n)]
+        cmd += ["--steps", str(args.steps), "--seed", str(args.seed), "--timeout", str(args.timeout)]
+        if args.trace:
+            cmd += ["--trace", str(args.trace)]
+        proc = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True)
+        level = json.loads(proc.stdout.strip().splitlines()[-1])
+        levels.append(level)
+
+        rerun = level["rerun_s"]
+        print(
+            f"{n:>3} sessions: p50 {rerun['p50'] * 1000:8.1f} ms  p95 {rerun['p95'] * 1000:8.1f} ms  "
+            f"p99 {rerun['p99'] * 1000:8.1f} ms  {level['reruns_per_s']:6.1f} reruns/s  "
+            f"peak RSS {level['peak_rss_mb']:7.1f} MB  errors {len(level['errors'])}"
+        )
+        for name, stats in level["cache"].items():
+            print(f"      {name:>14}: hit rate {stats['hit_rate']:6.1%} ({stats['hits']} / {stats['hits'] + stats['misses']})")
+
+    args.output.write_text(json.dumps({"levels": levels}, ensure_ascii=False, indent=2))
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark both dashboard pages on synthetic markets of growing size.
+
+Usage::
+
+    python -m benchmarks.run                              # 100x4 and 1000x4
+    python -m benchmarks.run --scale 10000x20 --days-per-year 60
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+A scale is ``<tickers>x<years>``. For each one a synthetic data set is
+generated (see ``benchmarks.synthetic``) and ``benchmarks.stages`` times
+the pipeline in a fresh process. Results are written as JSON; with
+``--baseline`` every stage is compared with the stored run and the
+command exits with status 1 if any stage got slower than ``--tolerance``
+times its baseline (ignoring differences under ``--min-delta`` seconds).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import generate
+
+DEFAULT_SCALES = ["100x4", "1000x4"]
+
+
+def parse_scale(text):
+    """'1000x4' -> (1000, 4)."""
+    tickers, years = text.lower().split("x")
+    return int(tickers), int(years)
+
+
+def run_scale(scale, days_per_year, repeat, data_root=None):
+    """Generate the data set for `scale` and time it; return its result entry."""
+    tickers, years = parse_scale(scale)
+    with tempfile.TemporaryDirectory(dir=data_root) as tmp:
+        rows = generate(Path(tmp), tickers, years, days_per_year)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.stages", "--repeat", str(repeat)],
+            env={**os.environ, "DASHBOARD_DATA_DIR": tmp},
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+    return {
+        "tickers": tickers,
+        "years": years,
+        "days_per_year": days_per_year,
+        "rows": rows,
+        "stages": json.loads(proc.stdout),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Stages slower than their baseline: [(scale, stage, baseline, now)]."""
+    regressions = []
+    for scale, entry in results["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            continue
+        for stage, seconds in entry["stages"].items():
+            before = base["stages"].get(stage)
+            if before is None:
+                continue
+            if seconds > before * tolerance and seconds - before > min_delta:
+                regressions.append((scale, stage, before, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", action="append", help="<tickers>x<years>, repeatable")
+    parser.add_argument("--days-per-year", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-root", type=Path, help="where to generate the data sets")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-delta", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    results = {"python": platform.python_version(), "machine": platform.machine(), "scales": {}}
+    for scale in args.scale or DEFAULT_SCALES:
+        entry = run_scale(scale, args.days_per_year, args.repeat, args.data_root)
+        results["scales"][scale] = entry
+        print(f"{scale} ({entry['rows']['daily']:,} daily rows)")
+        for stage, seconds in entry["stages"].items():
+            print(f"  {stage:>20}: {seconds * 1000:10.2f} ms")
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for scale, stage, before, now in regressions:
+            print(f"REGRESSION {scale} {stage}: {before * 1000:.2f} ms -> {now * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
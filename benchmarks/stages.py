@@ -0,0 +1,152 @@
+"""Headless timings of the dashboard stages on the data set in DASHBOARD_DATA_DIR.
+
+``benchmarks.run`` starts this module in a fresh process per data set, so
+the process-wide caches start cold exactly as after a server restart. The
+result is printed to stdout as one JSON object of stage -> seconds.
+
+Cold stages (etl, load, process_data, page_load) run once; the stages a
+rerun repeats take the best of ``--repeat`` runs. Lookup stages report
+the time per ticker.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+# Cột BCTC trang Phân loại đầu tư hiển thị
+PAGE_BCTC_COLUMNS = [
+    "MÃ", "NĂM", "CĐKT. TÀI SẢN NGẮN HẠN", "CĐKT. TỔNG CỘNG TÀI SẢN",
+    "CĐKT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN", "CĐKT. NỢ PHẢI TRẢ", "CĐKT. NỢ NGẮN HẠN",
+    "CĐKT. VỐN CHỦ SỞ HỮU", "KQKD. DOANH THU THUẦN",
+    "KQKD. LỢI NHUẬN SAU THUẾ THU NHẬP DOANH NGHIỆP",
+]
+
+
+def timed(fn, repeat=1):
+    """(best wall time over `repeat` calls, last result)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(repeat=5, lookups=50, seed=0):
+    """Time every stage; return {stage: seconds}."""
+    from core.bctc import build_bctc, load_bctc
+    from core.charts import downsample
+    from core.cube import FilterCube
+    from core.data import DATASETS, load_dataset, load_datasets
+    from core.etl import build_dataset
+    from core.master import build_master, filter_rows
+    from core.panel import load_panel
+    from core.peers import load_peer_index
+    from core.risk import risk_metrics
+    from core.scoring import build_scores
+    from core.screener import SCREEN_EXAMPLE, load_screen_index
+
+    stages = {}
+
+    def etl():
+        for name in DATASETS:
+            build_dataset(name)
+        build_bctc()
+        build_scores()
+
+    stages["etl"], _ = timed(etl)
+
+    # ---- Home.py ----
+    stages["load"], _ = timed(lambda: (load_datasets("health", "flow"), load_panel()))
+    stages["process_data"], (df, panel_idx, cube, year_frames) = timed(build_master)
+    stages["risk_metrics"], _ = timed(lambda: risk_metrics(panel_idx.frame), repeat)
+
+    # Bộ lọc mặc định của sidebar
+    year = max(year_frames)
+    industries = sorted(df["Ngành"].dropna().unique())[:10]
+    ratings = sorted(df["Credit_Rating_Z"].dropna().unique())
+    flags = [1, 0]
+
+    def sidebar():
+        cells = cube.select(year, industries, ratings, flags)
+        return cells, filter_rows(year_frames[year], industries, ratings, flags)
+
+    stages["sidebar_filter"], (cells, dff) = timed(sidebar, repeat)
+    stages["kpi_aggregation"], _ = timed(lambda: cube.kpis(cells), repeat)
+
+    df_flow = load_dataset("flow")
+
+    def chart_data():
+        return (
+            FilterCube.rating_counts(cells),
+            FilterCube.industry_health(cells),
+            FilterCube.heatmap(cells),
+            df_flow.groupby("Health_Group")["Total_Net_F_Val"].sum(),
+            dff.head(20),
+        )
+
+    stages["chart_data"], _ = timed(chart_data, repeat)
+
+    tickers = np.random.default_rng(seed).choice(panel_idx.tickers, lookups)
+
+    def ticker_lookup():
+        for ticker in tickers:
+            ts = panel_idx.lookup(ticker, panel_idx.date_min, panel_idx.date_max)
+            downsample(ts, "Date", "Price")
+            downsample(ts, "Date", "MarketCap")
+            downsample(ts, "Date", "Volume", method="minmax")
+
+    best, _ = timed(ticker_lookup, repeat)
+    stages["ticker_lookup"] = best / lookups
+
+    def range_summary():
+        for ticker in tickers:
+            panel_idx.ranges.summary(ticker, panel_idx.date_min, panel_idx.date_max)
+
+    best, _ = timed(range_summary, repeat)
+    stages["range_summary"] = best / lookups
+
+    # ---- pages/Phan_loai_dau_tu.py ----
+    stages["page_load"], _ = timed(lambda: load_bctc(PAGE_BCTC_COLUMNS))
+
+    def page_flow():
+        for ticker in tickers:
+            flow = panel_idx.lookup(ticker, f"{year}-01-01", f"{year}-12-31").dropna(subset=["Net.F_Val"])
+            flow = flow.assign(
+                MA20=flow["Net.F_Val"].rolling(window=20, min_periods=1).mean(),
+                MA30=flow["Net.F_Val"].rolling(window=30, min_periods=1).mean(),
+            )
+            for col in ("MA20", "MA30"):
+                downsample(flow, "Date", col)
+            downsample(flow, "Date", "Net.F_Val", method="minmax")
+
+    best, _ = timed(page_flow, repeat)
+    stages["page_ticker_lookup"] = best / lookups
+
+    stages["peer_index"], peer_index = timed(load_peer_index)
+
+    def peer_lookup():
+        for ticker in tickers:
+            peer_index.similar(ticker, year, 5)
+            peer_index.similar(ticker, year, 5, same_industry=True)
+
+    best, _ = timed(peer_lookup, repeat)
+    stages["peer_lookup"] = best / lookups
+
+    # ---- pages/Bo_loc_co_phieu.py ----
+    stages["screen_index"], screen = timed(load_screen_index)
+    stages["screen_query"], _ = timed(lambda: screen.query(SCREEN_EXAMPLE), repeat)
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.repeat, args.lookups)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Synthetic market generator producing the dashboard's source files.
+
+Writes schema-compatible sources into a directory, under the same file
+names and column names as the real data:
+
+* ``<year>_BCTC.xlsx`` statements, one workbook per year;
+* ``Data_health_score_dashboard.parquet``, scored from those statements;
+* ``data_dau_tu.parquet``, the yearly foreign flow table;
+* ``Price_2124``, ``Marketcap_2124``, ``Volume_2124`` and
+  ``df_ft_sorted_2021_2024`` daily series (Parquet).
+
+Daily tables hold ``tickers x years x days_per_year`` rows each and are
+written one year at a time to bound memory.
+
+Usage::
+
+    python -m benchmarks.synthetic OUT_DIR --tickers 1000 --years 4
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.data import DATASETS
+from core.rules import HEALTH_GROUP_LABELS
+from core.scoring import (
+    BCTC_COLUMNS, CASH, CASH_BEGIN, CASH_END, COMPANY, CURRENT_ASSETS,
+    CURRENT_LIABILITIES, EQUITY, GROSS_PROFIT, INDUSTRY, INTEREST_EXPENSE,
+    LIABILITIES, NET_INCOME, NET_REVENUE, OPERATING_CASH_FLOW,
+    OPERATING_PROFIT, TICKER, TOTAL_ASSETS, YEAR, compute_ratios, score,
+)
+
+FIRST_YEAR = 2021
+
+
+def tickers(n_tickers):
+    """Ticker codes T00000, T00001, ..."""
+    return np.array([f"T{i:05d}" for i in range(n_tickers)])
+
+
+def synthetic_bctc(n_tickers, n_years, n_industries=20, first_year=FIRST_YEAR, seed=0):
+    """Random statement panel with one row per (ticker, year)."""
+    rng = np.random.default_rng(seed)
+    n = n_tickers * n_years
+    codes = tickers(n_tickers)
+    industry = rng.integers(0, n_industries, n_tickers)
+
+    assets = rng.lognormal(7, 1.5, n)
+    liabilities = assets * rng.uniform(0.1, 0.9, n)
+    current_liabilities = liabilities * rng.uniform(0.3, 1.0, n)
+    revenue = assets * rng.lognormal(0, 0.6, n)
+    operating = revenue * rng.normal(0.06, 0.08, n)
+    cash_begin = assets * rng.uniform(0.01, 0.3, n)
+    cash_end = assets * rng.uniform(0.01, 0.3, n)
+
+    return pd.DataFrame({
+        TICKER: np.repeat(codes, n_years),
+        YEAR: np.tile(np.arange(first_year, first_year + n_years, dtype=np.int16), n_tickers),
+        COMPANY: np.char.add("Công ty ", np.repeat(codes, n_years)),
+        INDUSTRY: np.char.add("Ngành ", np.repeat(industry, n_years).astype(str)),
+        CURRENT_ASSETS: assets * rng.uniform(0.2, 0.8, n),
+        CASH: cash_end,
+        TOTAL_ASSETS: assets,
+        LIABILITIES: liabilities,
+        CURRENT_LIABILITIES: current_liabilities,
+        EQUITY: assets - liabilities,
+        NET_REVENUE: revenue,
+        GROSS_PROFIT: revenue * rng.uniform(0.05, 0.4, n),
+        INTEREST_EXPENSE: -liabilities * rng.uniform(0, 0.08, n),
+        OPERATING_PROFIT: operating,
+        NET_INCOME: operating * 0.8,
+        OPERATING_CASH_FLOW: revenue * rng.normal(0.05, 0.1, n),
+        CASH_BEGIN: cash_begin,
+        CASH_END: cash_end,
+    })[BCTC_COLUMNS]
+
+
+def synthetic_health(bctc, seed=0):
+    """Health table scored from `bctc` the way the dashboard file is."""
+    rng = np.random.default_rng(seed)
+    df = score(compute_ratios(bctc), ratio_groups=None, score_groups=None)
+    df["Health_Group"] = rng.integers(0, len(HEALTH_GROUP_LABELS), len(df))
+    df["Health_Label"] = df["Health_Group"].map(HEALTH_GROUP_LABELS)
+    df["Health_Group_score"] = df["Health_Group"]
+    return df.rename(columns={"Ticker": "Mã"})
+
+
+def synthetic_flow(health, seed=0):
+    """Yearly foreign flow table for every (ticker, year) of `health`."""
+    rng = np.random.default_rng(seed + 1)
+    net = rng.normal(0, 5e10, len(health))
+    return pd.DataFrame({
+        "Mã": health["Mã"].to_numpy(),
+        "Year": health["Year"].astype("int64").to_numpy(),
+        "Total_Net_F_Val": net,
+        "Foreign_Status": np.where(net > 0, "Buy_Net", "Sell_Net"),
+        "Foreign_Status_Flag": (net > 0).astype("int64"),
+        "Health_Group": health["Health_Group"].to_numpy(),
+        "Buy_Net_Flag": (net > 0).astype("int64"),
+    })
+
+
+def write_daily(out_dir, codes, years, days_per_year, seed=0):
+    """Write the four daily sources, one year (row group) at a time."""
+    rng = np.random.default_rng(seed + 2)
+    n = len(codes)
+    price = rng.uniform(5e3, 1e5, n)
+    shares = rng.uniform(1e6, 1e8, n)
+
+    writers = {}
+    try:
+        for year in years:
+            dates = pd.bdate_range(f"{year}-01-01", f"{year}-12-31")[:days_per_year]
+            steps = rng.normal(0, 0.02, (n, len(dates)))
+            prices = price[:, None] * np.exp(np.cumsum(steps, axis=1))
+            price = prices[:, -1]
+
+            flat = prices.ravel()
+            columns = {
+                "price": ("Giá", flat),
+                "mcap": ("MarketCap", flat * np.repeat(shares, len(dates))),
+                "volume": ("Khối lượng", rng.integers(0, 10_000_000, len(flat)).astype("float64")),
+                "ft": ("Net.F_Val", rng.normal(0, 1e9, len(flat))),
+            }
+            keys = {
+                "Mã": pa.array(np.repeat(codes, len(dates))).dictionary_encode(),
+                "Ngày": pa.array(np.tile(dates.to_numpy(), n)),
+            }
+            for name, (column, values) in columns.items():
+                table = pa.table({**keys, column: values})
+                if name not in writers:
+                    writers[name] = pq.ParquetWriter(out_dir / DATASETS[name], table.schema)
+                writers[name].write_table(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+def generate(out_dir, n_tickers, n_years, days_per_year=252, seed=0, bctc=True):
+    """Write a full synthetic data set into `out_dir`; return row counts."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    years = range(FIRST_YEAR, FIRST_YEAR + n_years)
+
+    statements = synthetic_bctc(n_tickers, n_years, seed=seed)
+    if bctc:
+        for year, part in statements.groupby(YEAR):
+            part.drop(columns=YEAR).to_excel(out_dir / f"{year}_BCTC.xlsx", index=False)
+
+    health = synthetic_health(statements, seed)
+    health.to_parquet(out_dir / DATASETS["health"], index=False)
+    synthetic_flow(health, seed).to_parquet(out_dir / DATASETS["flow"], index=False)
+
+    codes = tickers(n_tickers)
+    write_daily(out_dir, codes, years, days_per_year, seed)
+    return {
+        "bctc": len(statements) if bctc else 0,
+        "health": len(health),
+        "daily": n_tickers * n_years * days_per_year,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--days-per-year", type=int, default=252)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-bctc", action="store_true", help="skip the xlsx workbooks")
+    args = parser.parse_args(argv)
+
+    rows = generate(
+        args.out_dir, args.tickers, args.years, args.days_per_year, args.seed, not args.no_bctc
+    )
+    for name, count in rows.items():
+        print(f"{name:>8}: {count:>12,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Year-level aggregates of the daily series, refreshed partition by partition.
+
+The master table on Home.py needs per (Ticker, Year) price and market cap
+statistics. The store keeps each daily dataset as one Parquet partition
+per year, so the aggregate of a year is cached against that partition's
+fingerprint: when a new year of data arrives only its partition is read
+and aggregated, the other years are served from memory.
+"""
+import threading
+
+import pandas as pd
+
+from core.cachestats import record
+from core.data import dataset_path, normalize, path_fingerprint
+from core.profiling import profiled
+
+# Dataset -> (cột giá trị, {cột kết quả: hàm gộp})
+YEARLY_STATS = {
+    "price": ("Price", {"Avg_Price": "mean", "Max_Price": "max", "Min_Price": "min"}),
+    "mcap": ("MarketCap", {"Avg_MarketCap": "mean"}),
+}
+
+_cache = {}  # (dataset, partition path) -> (fingerprint, DataFrame)
+_lock = threading.Lock()
+
+
+def partitions(name):
+    """Map year -> partition directory of dataset `name`.
+
+    A legacy flat file is returned as a single partition under key None.
+    """
+    path = dataset_path(name)
+    if not path.is_dir():
+        return {None: path}
+    return {int(p.name.split("=", 1)[1]): p for p in sorted(path.glob("Year=*"))}
+
+
+def _aggregate(name, year, path):
+    """Per (Ticker, Year) statistics of one partition."""
+    column, stats = YEARLY_STATS[name]
+    if year is None:
+        df = normalize(pd.read_parquet(path))
+    else:
+        df = normalize(pd.read_parquet(path, columns=["Ticker", column]))
+        df["Year"] = year
+
+    result = (
+        df.groupby(["Ticker", "Year"], observed=True)[column]
+        .agg(**{out: func for out, func in stats.items()})
+        .astype("float64")
+        .reset_index()
+    )
+    # Mỗi partition có bộ category riêng; dùng str để ghép các năm
+    return result.astype({"Ticker": str, "Year": "int16"})
+
+
+@profiled("yearly_stats")
+def yearly_stats(name):
+    """Year-level statistics of dataset `name` (see ``YEARLY_STATS``)."""
+    parts = partitions(name)
+    frames = []
+    for year, path in parts.items():
+        key = (name, str(path))
+        fp = path_fingerprint(path)
+        entry = _cache.get(key)
+        if entry is None or entry[0] != fp:
+            with _lock:
+                entry = _cache.get(key)
+                if entry is None or entry[0] != fp:
+                    record("yearly_stats", hit=False)
+                    entry = (fp, _aggregate(name, year, path))
+                    _cache[key] = entry
+        else:
+            record("yearly_stats", hit=True)
+        frames.append(entry[1])
+
+    # Bỏ các partition đã bị xóa khỏi store
+    current = {str(path) for path in parts.values()}
+    for key in [k for k in _cache if k[0] == name and k[1] not in current]:
+        _cache.pop(key, None)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,170 @@
+"""Columnar cache for the yearly financial statement workbooks (BCTC).
+
+Parsing ``<year>_BCTC.xlsx`` through openpyxl is the slowest cold-start
+step, so the concatenated table is kept as ``store/BCTC.parquet``. The
+Parquet footer records the fingerprint of every workbook it was built
+from; the cache is rebuilt only when a workbook is added, removed or
+modified, and only the changed workbooks are parsed again. A workbook
+that cannot be read is left out of the footer, so it is retried on the
+next load. Reads can be restricted to the columns a page displays.
+"""
+import json
+import os
+import re
+import threading
+import warnings
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.cachestats import record
+from core.data import DATA_DIR, STORE_DIR
+from core.profiling import profiled
+from core.shared import shared_table
+
+BCTC_PATTERN = re.compile(r"^(\d{4})_BCTC\.xlsx$")
+BCTC_FILE = "BCTC.parquet"
+METADATA_KEY = b"bctc_sources"
+
+_cache = {}  # columns -> (sources fingerprint, DataFrame)
+_lock = threading.Lock()
+
+
+def bctc_sources(source_dir=DATA_DIR):
+    """Map year -> BCTC workbook for every ``<year>_BCTC.xlsx`` found."""
+    years = {}
+    for path in source_dir.glob("*_BCTC.xlsx"):
+        match = BCTC_PATTERN.match(path.name)
+        if match:
+            years[int(match.group(1))] = path
+    return dict(sorted(years.items()))
+
+
+def sources_fingerprint(sources):
+    """JSON-serializable fingerprint of the workbooks: [[year, mtime, size]]."""
+    fp = []
+    for y, path in sources.items():
+        stat = path.stat()
+        fp.append([y, stat.st_mtime_ns, stat.st_size])
+    return fp
+
+
+def read_bctc(sources):
+    """Concatenate BCTC workbooks with upper-cased, stripped column names.
+
+    A workbook that cannot be read is skipped with a warning; the other
+    years are still returned.
+    """
+    dfs = []
+    for y, path in sources.items():
+        try:
+            df = pd.read_excel(path)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            warnings.warn(f"skipping unreadable BCTC workbook {path.name}: {e}")
+            continue
+        df["NĂM"] = y  # Đổi thành in hoa cho đồng bộ với file
+        dfs.append(df)
+    if not dfs:
+        return pd.DataFrame()
+
+    df_bctc = pd.concat(dfs, ignore_index=True)
+    # Chuẩn hóa tên cột về in hoa để đồng bộ với file gốc
+    df_bctc.columns = [col.strip().upper() for col in df_bctc.columns]
+    df_bctc["NĂM"] = df_bctc["NĂM"].astype("int16")
+    df_bctc["MÃ"] = df_bctc["MÃ"].astype("category")
+    return df_bctc
+
+
+def build_bctc(source_dir=DATA_DIR, store_dir=STORE_DIR):
+    """(Re)build the Parquet cache; return its row count or None.
+
+    Years whose workbook fingerprint matches the existing cache are copied
+    from it instead of being parsed again. Only the years actually read
+    are fingerprinted in the footer.
+    """
+    sources = bctc_sources(source_dir)
+    target = store_dir / BCTC_FILE
+    cached = {y: [mtime, size] for y, mtime, size in cached_fingerprint(target) or []}
+    unchanged = [y for y, mtime, size in sources_fingerprint(sources) if cached.get(y) == [mtime, size]]
+
+    parts = []
+    if unchanged:
+        parts.append(pd.read_parquet(target, filters=[("NĂM", "in", unchanged)]))
+    changed = {y: path for y, path in sources.items() if y not in unchanged}
+    if changed:
+        parts.append(read_bctc(changed))
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return None
+
+    df_bctc = pd.concat(parts, ignore_index=True).sort_values("NĂM", kind="stable", ignore_index=True)
+    df_bctc["MÃ"] = df_bctc["MÃ"].astype("category")
+
+    table = pa.Table.from_pandas(df_bctc, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    # Workbook lỗi không được ghi dấu, lần tải sau sẽ đọc lại
+    read = set(df_bctc["NĂM"].unique().tolist())
+    fp = [entry for entry in sources_fingerprint(sources) if entry[0] in read]
+    metadata[METADATA_KEY] = json.dumps(fp).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(target)
+    return len(df_bctc)
+
+
+def cached_fingerprint(path):
+    """Fingerprint stored in the cache file's footer, or None."""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = metadata.get(METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+@profiled("load_bctc")
+def load_bctc(columns=None, source_dir=DATA_DIR, store_dir=STORE_DIR):
+    """Return the BCTC table, rebuilding the cache only if a workbook changed.
+
+    `columns` restricts the read to those columns (missing ones are
+    ignored). The returned frame is shared process-wide; treat it as
+    read-only.
+    """
+    key = tuple(columns) if columns is not None else None
+    current = sources_fingerprint(bctc_sources(source_dir))
+    if not current:
+        return pd.DataFrame()
+
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == current:
+        record("bctc", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == current:
+            record("bctc", hit=True)
+            return entry[1]
+
+        record("bctc", hit=False)
+        path = store_dir / BCTC_FILE
+        if cached_fingerprint(path) != current:
+            build_bctc(source_dir, store_dir)
+
+        # Khóa theo dấu trong cache (chỉ các năm đọc được), không theo nguồn
+        stored = cached_fingerprint(path)
+        if stored is None:
+            # Không đọc được workbook nào
+            df_bctc = pd.DataFrame()
+        else:
+            # Cả bảng được map từ kho dùng chung; các tập cột chỉ là khung nhìn
+            df_bctc = shared_table("bctc", stored, lambda: pd.read_parquet(path))
+        if columns is not None:
+            df_bctc = df_bctc[[col for col in columns if col in df_bctc.columns]]
+        _cache[key] = (current, df_bctc)
+    return df_bctc
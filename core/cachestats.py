@@ -0,0 +1,40 @@
+"""Hit/miss counters for the process-wide caches.
+
+Every cache in ``core`` records whether a request was served from memory
+(hit) or had to read/compute (miss), so load tests and diagnostics can
+report hit rates per cache.
+"""
+import threading
+from collections import Counter
+
+_hits = Counter()
+_misses = Counter()
+_lock = threading.Lock()
+
+
+def record(name, hit):
+    """Count one request to cache `name`."""
+    with _lock:
+        (_hits if hit else _misses)[name] += 1
+
+
+def snapshot():
+    """{cache: {"hits", "misses", "hit_rate"}} for every cache seen so far."""
+    with _lock:
+        names = sorted(set(_hits) | set(_misses))
+        stats = {}
+        for name in names:
+            hits, misses = _hits[name], _misses[name]
+            stats[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses),
+            }
+    return stats
+
+
+def reset():
+    """Forget all counts."""
+    with _lock:
+        _hits.clear()
+        _misses.clear()
@@ -0,0 +1,115 @@
+"""Server-side downsampling for long daily time-series charts.
+
+Plotly ships every point of a trace to the browser, so a multi-year daily
+series costs thousands of points per chart and session. Series are reduced
+to roughly one point per horizontal pixel before plotting:
+
+* ``lttb`` (Largest-Triangle-Three-Buckets) keeps the visual shape of
+  line charts such as price or moving averages;
+* ``minmax`` keeps the extreme values of every bucket, which preserves
+  spikes in volume and flow series.
+
+Ranges that are still large can be drawn with WebGL (``Scattergl``)
+traces instead of SVG.
+"""
+import os
+
+import numpy as np
+import plotly.express as px
+
+# Bề rộng biểu đồ (pixel) mục tiêu và ngưỡng chuyển sang WebGL
+CHART_WIDTH_PX = int(os.environ.get("DASHBOARD_CHART_WIDTH_PX", 1200))
+WEBGL_MIN_POINTS = int(os.environ.get("DASHBOARD_WEBGL_MIN_POINTS", 5000))
+
+
+def _as_float(values):
+    """Numeric view of `values`; datetimes become their integer epoch."""
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("int64")
+    return values.astype("float64")
+
+
+def lttb_indices(x, y, n_out):
+    """Positions kept by Largest-Triangle-Three-Buckets downsampling."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i (of n_out - 2) covers rows [edges[i], edges[i + 1])
+    edges = np.append(
+        (np.arange(n_out - 2) * (n - 2) / (n_out - 2)).astype(np.int64) + 1,
+        n - 1,
+    )
+    sizes = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / sizes
+    avg_y = np.add.reduceat(y, edges) / sizes
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, n_out):
+    """Positions of the first, last, and each bucket's min and max value."""
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(edges, n)))
+    lows = np.minimum.reduceat(y, edges)[bucket]
+    highs = np.maximum.reduceat(y, edges)[bucket]
+
+    # First occurrence of the min and of the max inside every bucket
+    _, first_low = np.unique(bucket[y == lows], return_index=True)
+    _, first_high = np.unique(bucket[y == highs], return_index=True)
+    positions = np.concatenate([
+        [0, n - 1],
+        np.flatnonzero(y == lows)[first_low],
+        np.flatnonzero(y == highs)[first_high],
+    ])
+    return np.unique(positions)
+
+
+def downsample(df, x, y, max_points=None, method="lttb"):
+    """Rows of `df` to plot for column `y` against `x`.
+
+    Rows where `y` is missing are dropped; at most about `max_points`
+    (default: one per pixel of ``CHART_WIDTH_PX``) rows are returned in
+    their original order.
+    """
+    max_points = max_points or CHART_WIDTH_PX
+    valid = np.flatnonzero(df[y].notna().to_numpy())
+    if len(valid) <= max_points:
+        return df if len(valid) == len(df) else df.iloc[valid]
+
+    ys = _as_float(df[y].to_numpy()[valid])
+    if method == "minmax":
+        keep = minmax_indices(ys, max_points)
+    else:
+        keep = lttb_indices(_as_float(df[x].to_numpy()[valid]), ys, max_points)
+    return df.iloc[valid[keep]]
+
+
+def use_webgl(n_points):
+    """Whether a range of `n_points` raw points should be drawn with WebGL."""
+    return n_points >= WEBGL_MIN_POINTS
+
+
+def area(df, x, y, webgl=False, **kwargs):
+    """``px.area``, or the equivalent filled WebGL line when `webgl` is set."""
+    if not webgl:
+        return px.area(df, x=x, y=y, **kwargs)
+    fig = px.line(df, x=x, y=y, render_mode="webgl", **kwargs)
+    fig.update_traces(fill="tozeroy")
+    return fig
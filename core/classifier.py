@@ -0,0 +1,202 @@
+"""Investment classification model trained offline on the health ratios.
+
+Usage::
+
+    python -m core.classifier              # train on every ticker-year, save the model
+    python -m core.classifier --predict    # batch inference over the universe, rows/s
+
+The model learns the credit rating (``Credit_Rating_Z``) from the ratios
+that do not enter it: margins, asset turnover, cash flow to sales and
+revenue growth. The rating itself is a banded average of the
+``SCORE_RATIOS`` z-scores, so given those the model would only relearn
+the bands; without them it is a second opinion on the rating from the
+rest of the statements, with a confidence. It is a scikit-learn
+HistGradientBoostingClassifier, which takes the ratios' heavy tails and
+missing values as they are. Accuracy is cross-validated with folds
+grouped by ticker (shuffled, stratified by rating), so no company is
+scored by a model that saw its other years. Training runs here, never in
+the dashboard, and saves the fitted model with joblib under
+``store/models/`` together with its version, its cross-validated accuracy
+and the accuracy of always guessing the most common rating.
+
+The dashboard calls `model_ratings`: one vectorized prediction over the
+whole health table, cached per (model version, health file) in memory
+and in ``core.diskcache``, so a click is a lookup, not a prediction. The
+page shows the model's rating with its cross-validated accuracy, and only
+when `beats_baseline` holds.
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.model_selection import StratifiedGroupKFold, cross_val_score
+
+from core.cachestats import record
+from core.data import MODEL_DIR, fingerprint, load_dataset, path_fingerprint
+from core.diskcache import disk_cached
+from core.scoring import GROWTH, RATIOS, SCORE_RATIOS
+
+# Tăng khi đổi đặc trưng, nhãn hoặc tham số mô hình
+MODEL_VERSION = 3
+MODEL_FILE = "classifier.joblib"
+# Không dùng các chỉ số cấu thành nhãn (SCORE_RATIOS)
+FEATURES = [name for name in [*RATIOS, *GROWTH] if name not in SCORE_RATIOS]
+TARGET = "Credit_Rating_Z"
+PARAMS = {"max_iter": 200, "learning_rate": 0.1, "max_leaf_nodes": 31, "random_state": 0}
+CV_FOLDS = 5
+
+_cache = {}  # "ratings" -> (key, DataFrame)
+_lock = threading.Lock()
+
+
+def model_path():
+    return MODEL_DIR / MODEL_FILE
+
+
+def features(df):
+    """Feature matrix of `df`: the ratio columns, ±inf as missing."""
+    values = df.reindex(columns=FEATURES).to_numpy("float64", copy=True)
+    values[~np.isfinite(values)] = np.nan
+    return values
+
+
+def train(df, cv=CV_FOLDS):
+    """Fit the classifier on every labelled row of `df`; return the model entry."""
+    labelled = df[df[TARGET].notna()]
+    X, y = features(labelled), labelled[TARGET].astype(str).to_numpy()
+
+    # Độ chính xác khi luôn đoán hạng phổ biến nhất
+    baseline = float(pd.Series(y).value_counts(normalize=True).max()) if len(y) else None
+
+    start = time.perf_counter()
+    scores = np.array([])
+    if cv:
+        # Mọi năm của một mã nằm cùng một fold
+        folds = StratifiedGroupKFold(n_splits=cv, shuffle=True, random_state=PARAMS["random_state"])
+        scores = cross_val_score(HistGradientBoostingClassifier(**PARAMS), X, y, cv=folds,
+                                 groups=labelled["Ticker"].astype(str).to_numpy())
+    model = HistGradientBoostingClassifier(**PARAMS).fit(X, y)
+    elapsed = time.perf_counter() - start
+
+    digest = hashlib.sha1(repr((MODEL_VERSION, PARAMS, FEATURES)).encode())
+    digest.update(pd.util.hash_pandas_object(labelled[FEATURES + [TARGET]], index=False).to_numpy().tobytes())
+    return {
+        "model": model,
+        "model_id": f"v{MODEL_VERSION}-{digest.hexdigest()[:10]}",
+        "features": FEATURES,
+        "classes": list(model.classes_),
+        "rows": len(labelled),
+        "cv_accuracy": float(scores.mean()) if len(scores) else None,
+        "baseline_accuracy": baseline,
+        "train_seconds": elapsed,
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def save_model(entry):
+    """Write a model entry to `model_path` atomically."""
+    path = model_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    joblib.dump(entry, tmp)
+    os.replace(tmp, path)
+
+
+def load_model():
+    """The saved model entry, or None when no compatible model was trained."""
+    try:
+        entry = joblib.load(model_path())
+    except (OSError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+    if not isinstance(entry, dict) or not str(entry.get("model_id", "")).startswith(f"v{MODEL_VERSION}-"):
+        return None
+    return entry
+
+
+def beats_baseline(info):
+    """Whether the cross-validated accuracy beats guessing the most common rating."""
+    accuracy, baseline = info.get("cv_accuracy"), info.get("baseline_accuracy")
+    return accuracy is not None and baseline is not None and accuracy > baseline
+
+
+def predict(entry, df):
+    """Model_Rating and Model_Confidence for every row of `df`, in one batch."""
+    proba = entry["model"].predict_proba(features(df))
+    best = proba.argmax(axis=1)
+    return pd.DataFrame({
+        "Model_Rating": pd.Categorical(np.asarray(entry["classes"])[best], categories=entry["classes"]),
+        "Model_Confidence": proba[np.arange(len(best)), best].astype("float32"),
+    }, index=df.index)
+
+
+def _sources():
+    return path_fingerprint(model_path()), fingerprint("health")
+
+
+@disk_cached("model_ratings", sources=_sources, version=MODEL_VERSION)
+def _rate_universe():
+    entry = load_model()
+    df = load_dataset("health")
+    rated = pd.concat([df[["Ticker", "Year"]], predict(entry, df)], axis=1)
+    info = {key: entry.get(key) for key in ("model_id", "cv_accuracy", "baseline_accuracy")}
+    return info, rated.set_index(["Ticker", "Year"]).sort_index()
+
+
+def model_ratings():
+    """(model info, ratings indexed by (Ticker, Year)), or None without a model.
+
+    The info holds the model_id, cv_accuracy and baseline_accuracy.
+    """
+    if not model_path().exists():
+        return None
+    key = _sources()
+    entry = _cache.get("ratings")
+    if entry is not None and entry[0] == key:
+        record("model_ratings", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get("ratings")
+        if entry is None or entry[0] != key:
+            record("model_ratings", hit=False)
+            entry = (key, _rate_universe() if load_model() is not None else None)
+            _cache["ratings"] = entry
+    return entry[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--predict", action="store_true", help="rate the universe with the saved model")
+    parser.add_argument("--cv", type=int, default=CV_FOLDS, help="cross-validation folds, 0 to skip")
+    args = parser.parse_args(argv)
+
+    df = load_dataset("health")
+    if args.predict:
+        entry = load_model()
+        if entry is None:
+            parser.error(f"no model at {model_path()}; train it first")
+        start = time.perf_counter()
+        rated = predict(entry, df)
+        elapsed = time.perf_counter() - start
+        agree = (rated["Model_Rating"].astype(str) == df[TARGET].astype(str)).mean()
+        print(f"{entry['model_id']}: {len(df):,} rows in {elapsed * 1000:.1f} ms "
+              f"({len(df) / elapsed:,.0f} rows/s), agrees with {TARGET} on {agree:.1%} "
+              f"(in-sample; cv accuracy {entry['cv_accuracy'] or float('nan'):.1%})")
+        print(rated["Model_Rating"].value_counts().to_string())
+        return
+
+    entry = train(df, args.cv)
+    save_model(entry)
+    accuracy = "n/a" if entry["cv_accuracy"] is None else f"{entry['cv_accuracy']:.1%}"
+    print(f"{entry['model_id']}: {entry['rows']:,} rows, {len(FEATURES)} features, "
+          f"cv accuracy {accuracy} (most common rating {entry['baseline_accuracy'] or float('nan'):.1%}), trained in {entry['train_seconds']:.1f}s -> {model_path()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""Per-company view of the investor page, free of Streamlit.
+
+pages/Phan_loai_dau_tu.py and the batch report generator (core.report)
+build the same tables, score cards, narrative, foreign-flow charts and
+warnings from these functions; the page places them with Streamlit, the
+report writes them into a static HTML file.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from core.charts import downsample, use_webgl
+from core.rules import (
+    HEALTH_Z_VERDICT, NARRATIVE_TEXT, SUGGESTION_TEXT, WARNING_RULES, Z_SCORE_COLUMNS,
+    Z_STATUS_LABELS,
+)
+
+PAGE_CSS = """
+<style>
+body { background-color:#0b1220; color:#e5e7eb; }
+.block-container { padding-top:1.2rem; }
+
+.title { font-size:32px; font-weight:800; color:#0f172a; background-color:#ffffff; padding:10px 15px; border-radius:8px; display:inline-block; }
+.subtitle { color:#0f172a; margin-bottom:20px; font-size:14px; background-color:#ffffff; padding:8px 15px; border-radius:8px; display:inline-block; }
+
+.section { font-size:20px; font-weight:700; margin-top:32px; margin-bottom:12px; color:#0f172a; background-color:#ffffff; padding:10px 15px; border-radius:8px; display:inline-block; }
+
+.card {
+    background:#1f2a3d;
+    border:1px solid #2a3a52;
+    border-radius:16px;
+    padding:18px;
+}
+
+.card-health {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    border-radius:16px;
+    padding:20px;
+    color:#ffffff;
+    box-shadow:0 4px 6px rgba(0,0,0,0.1);
+}
+
+.card-rating {
+    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+    border-radius:16px;
+    padding:20px;
+    color:#ffffff;
+    box-shadow:0 4px 6px rgba(0,0,0,0.1);
+}
+
+.card-roa {
+    background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
+    border-radius:16px;
+    padding:20px;
+    color:#ffffff;
+    box-shadow:0 4px 6px rgba(0,0,0,0.1);
+}
+
+.card-roe {
+    background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
+    border-radius:16px;
+    padding:20px;
+    color:#ffffff;
+    box-shadow:0 4px 6px rgba(0,0,0,0.1);
+}
+
+.card-white {
+    background:#ffffff;
+    color:#0f172a;
+    border-radius:16px;
+    padding:22px;
+    box-shadow:0 10px 24px rgba(0,0,0,.25);
+    margin-bottom:20px;
+}
+
+.card-title { font-size:13px; color:rgba(255,255,255,0.8); margin-bottom:8px; }
+.card-value { font-size:28px; font-weight:800; }
+
+.info-label { font-weight:600; color:#374151; margin-top:12px; }
+.info-value { color:#111827; margin-left:8px; }
+
+.analysis-box {
+    background:#ffffff;
+    color:#0f172a;
+    border-left:4px solid #667eea;
+    border-radius:8px;
+    padding:20px;
+    margin:20px 0;
+}
+
+.warning-box {
+    background:#fff3cd;
+    color:#856404;
+    border-left:4px solid #ffc107;
+    border-radius:8px;
+    padding:20px;
+    margin:20px 0;
+}
+
+.suggestion-box {
+    background:#d1ecf1;
+    color:#0c5460;
+    border-left:4px solid #17a2b8;
+    border-radius:8px;
+    padding:20px;
+    margin:20px 0;
+}
+</style>
+"""
+
+# Bảng chỉ tiêu tài chính chi tiết (BCTC), đơn vị tỷ đồng
+BCTC_DETAIL_COLUMNS = [
+    "NĂM", "CĐKT. TÀI SẢN NGẮN HẠN", "CĐKT. TỔNG CỘNG TÀI SẢN", "CĐKT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN",
+    "CĐKT. NỢ PHẢI TRẢ", "CĐKT. NỢ NGẮN HẠN", "CĐKT. VỐN CHỦ SỞ HỮU", "CĐKT. TỔNG CỘNG NGUỒN VỐN",
+    "KQKD. DOANH THU THUẦN", "KQKD. LỢI NHUẬN SAU THUẾ THU NHẬP DOANH NGHIỆP",
+    "KQKD. LÃI CƠ BẢN TRÊN CỔ PHIẾU", "LCTT. LƯU CHUYỂN TIỀN TỆ RÒNG TỪ CÁC HOẠT ĐỘNG SẢN XUẤT KINH DOANH (TT)",
+    "LCTT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN CUỐI KỲ (TT)"
+]
+
+# Ánh xạ tên cột bảng sức khỏe sang tiếng Việt (theo thứ tự hiển thị)
+HEALTH_COLUMN_LABELS = {
+    "Health_Score": "Điểm sức khỏe",
+    "Health_Group": "Nhóm sức khỏe",
+    "Credit_Rating_Z": "Xếp hạng tín nhiệm",
+    "Current Ratio": "Tỷ lệ thanh khoản hiện tại",
+    "Cash Ratio": "Tỷ lệ tiền mặt",
+    "Interest Coverage": "Khả năng trả lãi",
+    "Debt to Asset": "Nợ/Tài sản",
+    "Equity Ratio": "Tỷ lệ vốn chủ sở hữu",
+    "ROA": "ROA (%)",
+    "ROE": "ROE (%)",
+    "Net Profit Margin": "Biên LN ròng",
+    "Operating Profit Margin": "Biên LN HĐKD",
+    "Total Asset Turnover": "Vòng quay tài sản",
+    "Revenue Growth": "Tăng trưởng doanh thu",
+    "Net Income Growth": "Tăng trưởng LN ròng",
+    "Asset Growth": "Tăng trưởng tài sản"
+}
+
+
+
+class _Values(dict):
+    """Row values for the narrative templates; missing columns read as 0."""
+
+    def __missing__(self, key):
+        return 0
+
+
+def bctc_detail(df_bctc, ticker):
+    """BCTC rows of `ticker`, newest year first, restricted to the shown columns."""
+    if df_bctc.empty or "MÃ" not in df_bctc.columns:
+        return pd.DataFrame()
+    rows = df_bctc[df_bctc["MÃ"] == ticker]
+    cols = [col for col in BCTC_DETAIL_COLUMNS if col in rows.columns]
+    if rows.empty or not cols:
+        return pd.DataFrame()
+    return rows[cols].sort_values("NĂM", ascending=False)
+
+
+def health_table(health_data):
+    """Health row(s) with Vietnamese column names."""
+    return health_data[list(HEALTH_COLUMN_LABELS)].rename(columns=HEALTH_COLUMN_LABELS)
+
+
+def score_cards(info):
+    """HTML of the four quick-conclusion cards: Z-score, rating, ROA, ROE.
+
+    `info` is a row of the annotated health table (see core.rules.annotate).
+    """
+    health_z = info.get('Health_Z', None)
+    if pd.notna(health_z):
+        z_label, z_color = Z_STATUS_LABELS[info["Health_Z_status"]]
+        z_card = f"""
+    <div class="card-health">
+    <div class="card-title">Z-Score tổng hợp sức khỏe</div>
+    <div class="card-value" style="color:{z_color};">{health_z:.2f}</div>
+    <div style="font-size:14px; margin-top:8px; opacity:0.9;">{z_label}</div>
+    </div>
+    """
+    else:
+        z_card = """
+    <div class="card-health">
+    <div class="card-title">Z-Score tổng hợp sức khỏe</div>
+    <div class="card-value">N/A</div>
+    </div>
+    """
+
+    credit_rating = info.get('Credit_Rating_Z', 'N/A')
+    roa = info.get('ROA', 0)
+    roe = info.get('ROE', 0)
+    return [
+        z_card,
+        f"""
+<div class="card-rating">
+<div class="card-title">Xếp hạng tín nhiệm</div>
+<div class="card-value">{credit_rating}</div>
+</div>
+""",
+        f"""
+<div class="card-roa">
+<div class="card-title">ROA (%)</div>
+<div class="card-value">{roa:.2f}%</div>
+</div>
+""",
+        f"""
+<div class="card-roe">
+<div class="card-title">ROE (%)</div>
+<div class="card-value">{roe:.2f}%</div>
+</div>
+""",
+    ]
+
+
+def risk_cards(risk):
+    """HTML of the four market-risk cards of one ticker-year (see core.risk).
+
+    `risk` is a row of the risk table, or None when the ticker has no prices.
+    """
+    cards = [
+        ("card-health", "Lợi suất năm", "Annual_Return", "{:+.1%}"),
+        ("card-rating", "Biến động năm (năm hóa)", "Volatility", "{:.1%}"),
+        ("card-roa", "Sụt giảm tối đa", "Max_Drawdown", "{:.1%}"),
+        ("card-roe", "Beta so với thị trường", "Beta", "{:.2f}"),
+    ]
+    html = []
+    for css, title, col, fmt in cards:
+        value = None if risk is None else risk.get(col)
+        shown = fmt.format(value) if value is not None and pd.notna(value) else "N/A"
+        html.append(f"""
+<div class="{css}">
+<div class="card-title">{title}</div>
+<div class="card-value">{shown}</div>
+</div>
+""")
+    return html
+
+
+def model_rating_card(rating, confidence, rule_rating, cv_accuracy):
+    """HTML card of the classifier's rating next to the rule-based one.
+
+    Shows the model's cross-validated accuracy: the confidence is the
+    model's own probability and says nothing about how often it is right.
+    """
+    agreement = "Trùng với xếp hạng theo ngưỡng" if str(rating) == str(rule_rating) else f"Theo ngưỡng: {rule_rating}"
+    return f"""
+<div class="card-rating">
+<div class="card-title">Xếp hạng theo mô hình (tham khảo)</div>
+<div class="card-value">{rating}</div>
+<div style="font-size:14px; margin-top:8px; opacity:0.9;">Độ tin cậy {confidence:.0%} · {agreement}</div>
+<div style="font-size:12px; margin-top:6px; opacity:0.8;">Mô hình chỉ đúng khoảng {cv_accuracy:.0%} trên doanh nghiệp chưa gặp khi huấn luyện; xếp hạng theo ngưỡng là kết luận chính</div>
+</div>
+"""
+
+
+def analysis_html(info):
+    """Narrative explaining the health score of one ticker-year.
+
+    Only looks up the rule codes of the annotated row (see core.rules) and
+    fills their templates with the row's values.
+    """
+    values = _Values(info.items())
+    analysis_text = """
+<div class="analysis-box">
+<h3 style="color:#0f172a; margin-bottom:15px;">Phân tích chi tiết</h3>
+
+"""
+    for code_col, (title, templates) in NARRATIVE_TEXT.items():
+        analysis_text += f"<p><b>{title}:</b> {templates[info[code_col]].format_map(values)}</p>"
+
+    # Thêm các chỉ số Z-Score
+    analysis_text += "<h4 style='color:#0f172a; margin-top:20px; margin-bottom:10px;'>Đánh giá tổng quan (Z-Score)</h4>"
+
+    z_scores = [
+        (indicator, info[col], info[f"{col}_status"])
+        for indicator, col in Z_SCORE_COLUMNS
+        if pd.notna(info.get(f"{col}_status"))
+    ]
+    if len(z_scores) > 0:
+        analysis_text += "<p><b>Z-Score các chỉ tiêu chính:</b></p><ul>"
+        for indicator, z_val, code in z_scores[:6]:  # Show top 6
+            status, color = Z_STATUS_LABELS[code]
+            analysis_text += f'<li><b>{indicator}:</b> <span style="color:{color};">{z_val:.2f} ({status})</span></li>'
+        analysis_text += "</ul>"
+
+        health_status = info.get("Health_Z_status")
+        if pd.notna(health_status):
+            analysis_text += f"<p><b>Z-Score tổng hợp sức khỏe:</b> <span style='color:#667eea; font-weight:bold;'>{info['Health_Z']:.2f}</span></p>"
+            analysis_text += f"<p>{HEALTH_Z_VERDICT[health_status]}</p>"
+    else:
+        analysis_text += "<p>Z-Score không khả dụng cho doanh nghiệp này.</p>"
+
+    analysis_text += "</p></div>"
+    return analysis_text
+
+
+def flow_year_view(flow_year_data, ticker):
+    """(bar chart, comment HTML) of the yearly foreign net flow, or None."""
+    if len(flow_year_data) == 0 or "Total_Net_F_Val" not in flow_year_data.columns:
+        return None
+    flow_year_chart = flow_year_data.sort_values("Year")
+
+    fig_year = px.bar(
+        flow_year_chart,
+        x="Year",
+        y="Total_Net_F_Val",
+        title=f"Dòng tiền nhà đầu tư nước ngoài theo năm - {ticker}",
+        labels={"Total_Net_F_Val": "Giá trị mua/bán ròng (tỷ VND)", "Year": "Năm"},
+        color="Total_Net_F_Val",
+        color_continuous_scale="RdYlGn"
+    )
+    fig_year.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#e5e7eb',
+        title_font_color='#0f172a'
+    )
+    fig_year.update_traces(marker_line_color='rgba(0,0,0,0.3)', marker_line_width=1)
+
+    # Phân tích nhận xét
+    avg_flow = flow_year_chart["Total_Net_F_Val"].mean()
+    flow_trend = "tích lũy" if avg_flow > 0 else "rút ròng"
+    comment = f"""
+    <div class="analysis-box">
+    <p><b>Nhận xét:</b> Dòng tiền nước ngoài có xu hướng <b>{flow_trend}</b> trong giai đoạn {flow_year_chart['Year'].min():.0f}–{flow_year_chart['Year'].max():.0f}, 
+    với giá trị trung bình {avg_flow:,.0f} tỷ VND.</p>
+    </div>
+    """
+    return fig_year, comment
+
+
+def flow_daily_view(flow_daily_data, ticker, year):
+    """(line chart with MA20/MA30, comment HTML) of the daily net flow, or None.
+
+    `flow_daily_data` is one year of the daily panel for `ticker`.
+    """
+    if len(flow_daily_data) == 0 or "Net.F_Val" not in flow_daily_data.columns:
+        return None
+    flow_daily_chart = flow_daily_data[
+        flow_daily_data["Date"].notna() & flow_daily_data["Net.F_Val"].notna()
+    ].sort_values("Date")
+    if len(flow_daily_chart) == 0:
+        return None
+
+    # Calculate MA(20) and MA(30)
+    flow_daily_chart = flow_daily_chart.assign(
+        MA20=flow_daily_chart["Net.F_Val"].rolling(window=20, min_periods=1).mean(),
+        MA30=flow_daily_chart["Net.F_Val"].rolling(window=30, min_periods=1).mean(),
+    )
+
+    fig_daily = go.Figure()
+    # Giảm số điểm trước khi vẽ; MA đã tính trên toàn bộ dữ liệu ngày
+    trace = go.Scattergl if use_webgl(len(flow_daily_chart)) else go.Scatter
+    raw_plot = downsample(flow_daily_chart, "Date", "Net.F_Val", method="minmax")
+    ma20_plot = downsample(flow_daily_chart, "Date", "MA20")
+    ma30_plot = downsample(flow_daily_chart, "Date", "MA30")
+
+    # Add daily line
+    fig_daily.add_trace(trace(
+        x=raw_plot["Date"],
+        y=raw_plot["Net.F_Val"],
+        mode='lines',
+        name='Dòng tiền hàng ngày',
+        line=dict(color='rgba(102, 126, 234, 0.6)', width=1)
+    ))
+
+    # Add MA20
+    fig_daily.add_trace(trace(
+        x=ma20_plot["Date"],
+        y=ma20_plot["MA20"],
+        mode='lines',
+        name='Trung bình 20 ngày',
+        line=dict(color='#f5576c', width=2)
+    ))
+
+    # Add MA30
+    fig_daily.add_trace(trace(
+        x=ma30_plot["Date"],
+        y=ma30_plot["MA30"],
+        mode='lines',
+        name='Trung bình 30 ngày',
+        line=dict(color='#43e97b', width=2)
+    ))
+
+    fig_daily.update_layout(
+        title=f"Dòng tiền nhà đầu tư nước ngoài theo ngày - {ticker} ({year})",
+        xaxis_title="Ngày",
+        yaxis_title="Giá trị mua/bán ròng (tỷ VND)",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#e5e7eb',
+        title_font_color='#0f172a',
+        hovermode='x unified'
+    )
+
+    # Phân tích nhận xét
+    if len(flow_daily_chart) >= 30:
+        recent_trend = "tích cực" if flow_daily_chart["Net.F_Val"].tail(30).mean() > 0 else "tiêu cực"
+    else:
+        recent_trend = "tích cực" if flow_daily_chart["Net.F_Val"].mean() > 0 else "tiêu cực"
+    comment = f"""
+            <div class="analysis-box">
+            <p><b>Nhận xét:</b> Xu hướng dòng tiền trong năm cho thấy <b>{recent_trend}</b>, 
+            với biến động phản ánh hành vi giao dịch của nhà đầu tư nước ngoài.</p>
+            </div>
+            """
+    return fig_daily, comment
+
+
+def warnings_and_suggestions(info):
+    """(risk warnings, investment suggestions) of one annotated health row."""
+    warnings = [text for col, _, text in WARNING_RULES if info[col]]
+    suggestions = [SUGGESTION_TEXT[info["Suggestion_Code"]]]
+    return warnings, suggestions
+
+
+def alert_boxes(warnings, suggestions):
+    """HTML boxes for the warnings and suggestions (empty lists are skipped)."""
+    boxes = []
+    if len(warnings) > 0:
+        warning_text = "<ul>" + "".join([f"<li>{w}</li>" for w in warnings]) + "</ul>"
+        boxes.append(f"""
+    <div class="warning-box">
+    <h4 style="color:#856404; margin-bottom:10px;"> Rủi ro cần lưu ý</h4>
+    {warning_text}
+    </div>
+    """)
+    if len(suggestions) > 0:
+        suggestion_text = "<ul>" + "".join([f"<li>{s}</li>" for s in suggestions]) + "</ul>"
+        boxes.append(f"""
+    <div class="suggestion-box">
+    <h4 style="color:#0c5460; margin-bottom:10px;"> Gợi ý đầu tư</h4>
+    {suggestion_text}
+    </div>
+    """)
+    return boxes
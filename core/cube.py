@@ -0,0 +1,120 @@
+"""Pre-aggregated filter cube for the market overview KPIs and charts.
+
+The master table is aggregated once over every combination of the
+sidebar dimensions (Year, Ngành, Credit_Rating_Z, Buy_Net_Flag). Each
+cell stores mergeable statistics (row and ticker counts, sums and
+non-null counts for means, min/max), so any sidebar selection is answered
+by summing the matching cells instead of scanning the rows.
+
+Distinct tickers are not mergeable in general; summing the per-cell
+counts is exact because the master table has one row per (Ticker, Year),
+so a ticker falls in exactly one cell per year. `FilterCube` checks this
+on construction.
+"""
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["Year", "Ngành", "Credit_Rating_Z", "Buy_Net_Flag"]
+SAFE_RATINGS = ["AAA", "AA", "A"]
+
+
+class FilterCube:
+    """Cell statistics over the sidebar dimensions of the master table.
+
+    Raises ValueError when a ticker falls in more than one cell of a year.
+    """
+
+    def __init__(self, df):
+        work = df.assign(
+            _safe=df["Credit_Rating_Z"].isin(SAFE_RATINGS),
+            _rows=1,
+        )
+        self.cells = (
+            work.groupby(DIMENSIONS, dropna=False, observed=True)
+            .agg(
+                rows=("_rows", "sum"),
+                tickers=("Ticker", "nunique"),
+                safe=("_safe", "sum"),
+                health_n=("Health_Score", "count"),
+                health_sum=("Health_Score", "sum"),
+                buy_n=("Buy_Net_Flag", "count"),
+                buy_sum=("Buy_Net_Flag", "sum"),
+                mcap_sum=("Avg_MarketCap", "sum"),
+                price_n=("Avg_Price", "count"),
+                price_sum=("Avg_Price", "sum"),
+                price_max=("Max_Price", "max"),
+                price_min=("Min_Price", "min"),
+            )
+            .reset_index()
+        )
+        # Số mã của một lựa chọn = tổng số mã các ô; chỉ đúng khi mỗi mã nằm
+        # trong đúng một ô mỗi năm
+        per_year = df.groupby("Year", observed=True)["Ticker"].nunique()
+        if not self.cells.groupby("Year")["tickers"].sum().reindex(per_year.index).equals(per_year):
+            raise ValueError("a ticker falls in more than one cube cell of the same year")
+
+    def select(self, year, industries=(), ratings=(), flags=None):
+        """Cells matching the sidebar filters (empty lists mean "all").
+
+        Mirrors the row filter in Home.py: Ngành and rating filters only
+        apply when non-empty, the flow flag filter always applies.
+        """
+        cells = self.cells
+        mask = cells["Year"] == year
+        if len(industries) > 0:
+            mask &= cells["Ngành"].isin(industries)
+        if len(ratings) > 0:
+            mask &= cells["Credit_Rating_Z"].isin(ratings)
+        if flags is not None:
+            mask &= cells["Buy_Net_Flag"].isin(flags)
+        return cells[mask]
+
+    @staticmethod
+    def kpis(cells):
+        """Market KPI values for a selection of cells."""
+        def ratio(num, den):
+            den = cells[den].sum()
+            return cells[num].sum() / den if den else np.nan
+
+        return {
+            "num_companies": int(cells["tickers"].sum()),
+            "avg_health": ratio("health_sum", "health_n"),
+            "safe_pct": ratio("safe", "rows") * 100,
+            "buy_pct": ratio("buy_sum", "buy_n") * 100,
+            "total_mcap": cells["mcap_sum"].sum(),
+            "avg_price": ratio("price_sum", "price_n"),
+            "max_price": cells["price_max"].max(),
+            "min_price": cells["price_min"].min(),
+        }
+
+    @staticmethod
+    def rating_counts(cells):
+        """Number of companies per credit rating, most frequent first."""
+        return (
+            cells.groupby("Credit_Rating_Z", observed=True)["rows"]
+            .sum()
+            .loc[lambda s: s > 0]
+            .sort_values(ascending=False)
+            .reset_index()
+        )
+
+    @staticmethod
+    def industry_health(cells):
+        """Mean Health_Score per industry, best first."""
+        by_industry = cells.groupby("Ngành", observed=True)[["health_sum", "health_n"]].sum()
+        return (
+            (by_industry["health_sum"] / by_industry["health_n"].replace(0, np.nan))
+            .rename("Health_Score")
+            .sort_values(ascending=False)
+            .reset_index()
+        )
+
+    @staticmethod
+    def heatmap(cells):
+        """Company counts per (Ngành, Credit_Rating_Z)."""
+        return (
+            cells.groupby(["Ngành", "Credit_Rating_Z"], observed=True)["rows"]
+            .sum()
+            .loc[lambda s: s > 0]
+            .reset_index(name="Count")
+        )
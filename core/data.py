@@ -0,0 +1,178 @@
+"""Process-wide data access layer shared by Home.py and the pages.
+
+Each dataset is read and normalized once per server process and kept in
+memory until its file's fingerprint (mtime + size) changes, so reruns
+triggered by widgets never touch the disk. Pages only pay for the
+datasets they actually request.
+"""
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from core.cachestats import record
+from core.memory import compact
+from core.profiling import profiled
+from core.rules import RULES_VERSION, annotate
+
+# Thư mục dữ liệu; DASHBOARD_DATA_DIR cho phép trỏ sang bộ dữ liệu khác (vd. benchmark)
+DATA_DIR = Path(os.environ.get("DASHBOARD_DATA_DIR") or Path(__file__).resolve().parent.parent)
+STORE_DIR = DATA_DIR / "store"
+# Mô hình huấn luyện sẵn (chỉ mục láng giềng, bộ phân loại)
+MODEL_DIR = Path(os.environ.get("DASHBOARD_MODEL_DIR") or STORE_DIR / "models")
+
+# Tên dataset -> file Parquet tương ứng
+DATASETS = {
+    "health": "Data_health_score_dashboard.parquet",
+    "flow": "data_dau_tu.parquet",
+    "price": "Price_2124.parquet",
+    "mcap": "Marketcap_2124.parquet",
+    "volume": "Volume_2124.parquet",
+    "ft": "df_ft_sorted_2021_2024.parquet",
+}
+
+# Dataset dựng lại từ BCTC trong store (python -m core.etl --only scores); chỉ dùng thay file
+# gốc khi bật DASHBOARD_DERIVED=1, vì điểm tính lại khác bộ dữ liệu đã kiểm duyệt
+DERIVED = {"health": "Health_score_bctc.parquet"}
+USE_DERIVED = os.environ.get("DASHBOARD_DERIVED", "") not in ("", "0")
+
+# Đổi tên cột tiếng Việt về chuẩn chung
+RENAME_MAP = {
+    "Mã": "Ticker",
+    "Năm": "Year",
+    "Ngày": "Date",
+    "Giá": "Price",
+    "Khối lượng": "Volume",
+}
+
+NUMERIC_COLUMNS = ["Net.F_Val", "Total_Net_F_Val"]
+
+# Cột suy diễn gắn vào dataset ngay khi tải (mã nhận định, cờ cảnh báo, ...)
+ENRICH = {"health": annotate}
+
+_cache = {}  # name -> (fingerprint, DataFrame)
+_locks = {name: threading.Lock() for name in DATASETS}
+
+
+def dataset_path(name, derived=None):
+    """Return the on-disk path of dataset `name`.
+
+    The typed store built by ``python -m core.etl`` wins over the legacy
+    flat files in the repository root, unless the root file was modified
+    after it was compiled. A table rebuilt from the BCTC statements
+    (`DERIVED`) wins over both only when `derived` is True, which defaults
+    to ``DASHBOARD_DERIVED=1``.
+    """
+    if derived is None:
+        derived = USE_DERIVED
+    if derived and name in DERIVED and (STORE_DIR / DERIVED[name]).exists():
+        return STORE_DIR / DERIVED[name]
+    root = DATA_DIR / DATASETS[name]
+    compiled = STORE_DIR / DATASETS[name]
+    if not compiled.exists():
+        return root
+    # File gốc sửa sau lần chạy ETL cuối: bản trong store đã cũ
+    if root.exists() and root.stat().st_mtime_ns > compiled.stat().st_mtime_ns:
+        return root
+    return compiled
+
+
+def fingerprint(name):
+    """Return a cheap content fingerprint: (path, mtime_ns, size).
+
+    Partitioned datasets are directories; their fingerprint combines the
+    newest mtime and the total size of all files inside.
+    """
+    return path_fingerprint(dataset_path(name))
+
+
+def path_fingerprint(path):
+    """Fingerprint of a file or directory (see `fingerprint`)."""
+    if not path.is_dir():
+        stat = path.stat()
+        return str(path), stat.st_mtime_ns, stat.st_size
+
+    stats = [p.stat() for p in path.rglob("*") if p.is_file()]
+    return (
+        str(path),
+        max((st.st_mtime_ns for st in stats), default=0),
+        sum(st.st_size for st in stats),
+    )
+
+
+def fingerprints(*names):
+    """Fingerprints of several datasets, usable as an O(1) cache key."""
+    return tuple(fingerprint(name) for name in names)
+
+
+def normalize(df):
+    """Strip and rename columns, parse dates and numerics in place.
+
+    Every step is skipped when the data already has the target shape, so
+    frames read from the typed store pass through almost for free.
+    """
+    if any(col != col.strip() for col in df.columns):
+        df.columns = df.columns.str.strip()
+    if not RENAME_MAP.keys().isdisjoint(df.columns):
+        df.rename(columns=RENAME_MAP, inplace=True)
+
+    if "Date" in df.columns:
+        if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+            df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+        if "Year" not in df.columns:
+            df["Year"] = df["Date"].dt.year
+
+    # Year partitions come back from Parquet as a categorical column
+    if "Year" in df.columns and isinstance(df["Year"].dtype, pd.CategoricalDtype):
+        df["Year"] = df["Year"].astype("int16")
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def read_dataset(name):
+    """Read and normalize dataset `name` from disk, bypassing the cache."""
+    return normalize(pd.read_parquet(dataset_path(name)))
+
+
+@profiled("load_dataset")
+def load_dataset(name):
+    """Return normalized dataset `name`, re-reading it only when it changed.
+
+    The returned frame is shared between all sessions of the process and
+    must be treated as read-only; its dtypes are compacted once on load
+    and its buffers are memory-mapped from the shared store when possible.
+    """
+    # core.shared lấy STORE_DIR từ module này nên chỉ import khi gọi
+    from core.shared import shared_table
+
+    key = fingerprint(name)
+    entry = _cache.get(name)
+    if entry is not None and entry[0] == key:
+        record("dataset", hit=True)
+        return entry[1]
+
+    with _locks[name]:
+        entry = _cache.get(name)
+        if entry is None or entry[0] != key:
+            record("dataset", hit=False)
+            enrich = ENRICH.get(name)
+
+            def build():
+                df = compact(read_dataset(name), table=name)
+                return enrich(df) if enrich else df
+
+            # Bảng đã gắn mã luật phụ thuộc cả phiên bản bảng luật
+            shared_key = (key, RULES_VERSION) if enrich else key
+            df = shared_table(name, shared_key, build)
+            entry = (key, df)
+            _cache[name] = entry
+    return entry[1]
+
+
+def load_datasets(*names):
+    """Load several datasets at once, in the order given."""
+    return tuple(load_dataset(name) for name in names)
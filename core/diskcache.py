@@ -0,0 +1,200 @@
+"""Persistent result cache shared by every worker process and restart.
+
+Usage::
+
+    python -m core.diskcache             # list entries, newest first
+    python -m core.diskcache --clear
+
+`disk_cached` stores a function's result as a pickle under
+``store/cache/``, keyed by the function, its arguments, the fingerprints
+of the source files it depends on, a hash of the code that produces it
+(its module and every project module reachable from it) and a version to
+bump when the output changes for any other reason. A restarted or new worker on the same store finds results built
+by any other process instead of recomputing them.
+
+Entries are written to a private temp file and renamed into place, so
+concurrent readers see either the old or the new entry, never a partial
+one. Every hit refreshes the entry's mtime; when the directory grows past
+``DASHBOARD_CACHE_MAX_MB`` the least recently used entries are removed
+under an exclusive file lock. Hits and misses are counted in
+``core.cachestats`` as ``disk:<name>``.
+"""
+import argparse
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+import pandas as pd
+
+from core.cachestats import record
+from core.data import STORE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ dựa vào thao tác đổi tên nguyên tử
+    fcntl = None
+
+ENABLED = os.environ.get("DASHBOARD_CACHE", "1") != "0"
+CACHE_DIR = Path(os.environ.get("DASHBOARD_CACHE_DIR") or STORE_DIR / "cache")
+MAX_BYTES = int(float(os.environ.get("DASHBOARD_CACHE_MAX_MB", 512)) * 2**20)
+SUFFIX = ".pkl"
+LOCK_FILE = ".lock"
+
+
+def code_hash(fn):
+    """Hash of the source of `fn`'s module and the project modules it uses.
+
+    Project modules are those of the same top-level package, found through
+    module globals (imported modules, functions and classes), transitively.
+    Modules imported inside function bodies are not followed.
+    """
+    package = fn.__module__.split(".")[0]
+    seen, pending = set(), [fn.__module__]
+    while pending:
+        name = pending.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+        for value in vars(sys.modules[name]).values():
+            owner = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(owner, str) and owner.split(".")[0] == package:
+                pending.append(owner)
+
+    digest = hashlib.sha1()
+    for name in sorted(seen):
+        path = getattr(sys.modules[name], "__file__", None)
+        try:
+            digest.update(name.encode() + b"\0" + Path(path).read_bytes())
+        except (OSError, TypeError):
+            digest.update(name.encode())
+    return digest.hexdigest()
+
+
+def cache_key(name, version, args, kwargs, sources, code=None):
+    """Hex digest identifying one result of function `name`."""
+    digest = hashlib.sha1()
+    for part in (name, version, code, pd.__version__, args, sorted(kwargs.items()), sources):
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def entry_path(name, key):
+    return CACHE_DIR / f"{name}-{key}{SUFFIX}"
+
+
+def get(path):
+    """Unpickled entry at `path` (refreshing its LRU time), or None."""
+    try:
+        with path.open("rb") as f:
+            value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        # Entry written by code whose classes/modules no longer exist
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return value
+
+
+def put(path, value):
+    """Store `value` at `path` atomically, then enforce the size cap."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    evict()
+
+
+def entries():
+    """[(path, size, mtime)] of every entry, least recently used first."""
+    found = []
+    for path in CACHE_DIR.glob(f"*{SUFFIX}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        found.append((path, stat.st_size, stat.st_mtime))
+    return sorted(found, key=lambda entry: entry[2])
+
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cache fits `max_bytes`."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with (CACHE_DIR / LOCK_FILE).open("a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        found = entries()
+        total = sum(size for _, size, _ in found)
+        for path, size, _ in found:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def disk_cached(name, sources=None, version=1):
+    """Decorator caching a function's result on disk.
+
+    `sources(*args, **kwargs)` returns the fingerprints of the files the
+    result depends on. Edits to the producing code change the key by
+    themselves (see `code_hash`); bump `version` when the output changes
+    for another reason, e.g. code imported inside a function body.
+    """
+    def decorate(fn):
+        code = []  # tính ở lần gọi đầu, khi mọi module đã import xong
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+
+            if not code:
+                code.append(code_hash(fn))
+            deps = sources(*args, **kwargs) if sources is not None else None
+            path = entry_path(name, cache_key(name, version, args, kwargs, deps, code[0]))
+            value = get(path)
+            if value is not None:
+                record(f"disk:{name}", hit=True)
+                return value
+
+            record(f"disk:{name}", hit=False)
+            value = fn(*args, **kwargs)
+            try:
+                put(path, value)
+            except OSError:
+                pass
+            return value
+        return wrapper
+    return decorate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        evict(max_bytes=0)
+        print(f"cleared {CACHE_DIR}")
+        return
+
+    found = entries()
+    for path, size, mtime in reversed(found):
+        used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime))
+        print(f"{used}  {size / 2**20:9.2f} MB  {path.name}")
+    total = sum(size for _, size, _ in found)
+    print(f"{len(found)} entries, {total / 2**20:,.1f} MB of {MAX_BYTES / 2**20:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Offline build step: compile the raw sources into a typed Parquet store.
+
+Usage::
+
+    python -m core.etl                 # build every available source and the BCTC cache
+    python -m core.etl --only health price
+    python -m core.etl --only scores   # industry/year scores, changed years only
+    python -m core.etl --only scores --full          # rescore every year
+    python -m core.etl --only scores --whole-table   # dashboard convention, every year
+
+Every dataset is read once from its xlsx/csv/Parquet source, normalized
+with the same rules the dashboard uses (stripped and renamed columns,
+parsed dates) and written to ``store/`` with explicit dtypes. Daily series
+are partitioned by Year so later reads can prune whole years; a partition
+whose content did not change is not rewritten, so its fingerprint stays
+stable and per-year caches survive a rebuild. Once the store exists the
+data layer reads it instead of the legacy flat files. Rescored health
+tables are only built on request and only served with
+``DASHBOARD_DERIVED=1`` (see ``core.data.DERIVED``).
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.bctc import build_bctc
+from core.data import DATA_DIR, DATASETS, STORE_DIR, normalize
+from core.memory import compact
+from core.scoring import RATIO_GROUPS, SCORE_GROUPS, build_scores
+
+# Dataset -> tên file nguồn (không kèm đuôi)
+SOURCES = {name: filename.rsplit(".", 1)[0] for name, filename in DATASETS.items()}
+SOURCE_SUFFIXES = (".xlsx", ".csv", ".parquet")
+
+DAILY_DATASETS = ("price", "mcap", "volume", "ft")
+CATEGORY_COLUMNS = ["Ticker", "Ngành", "Credit_Rating_Z"]
+
+PARTITION_FILE = "part-0.parquet"
+HASH_KEY = b"content_hash"
+
+
+def find_source(name, source_dir=DATA_DIR):
+    """Return the first existing source file for dataset `name`, or None."""
+    for suffix in SOURCE_SUFFIXES:
+        path = source_dir / (SOURCES[name] + suffix)
+        if path.is_file():
+            return path
+    return None
+
+
+def read_source(path):
+    """Read an xlsx, csv or Parquet source file."""
+    if path.suffix == ".xlsx":
+        return pd.read_excel(path)
+    if path.suffix == ".csv":
+        return pd.read_csv(path)
+    return pd.read_parquet(path)
+
+
+def apply_schema(name, df):
+    """Cast a normalized frame to the store's explicit dtypes."""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    if "Date" in df.columns:
+        df = df.dropna(subset=["Date"])
+        df["Year"] = df["Date"].dt.year
+
+    if "Year" in df.columns:
+        df = df.dropna(subset=["Year"])
+        df["Year"] = df["Year"].astype("int16")
+
+    # Remaining strings, integers and float64 measures (see core.memory)
+    return compact(df)
+
+
+def write_parquet(df, target):
+    """Write `df` to `target`, replacing any previous version atomically."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp) if tmp.is_dir() else tmp.unlink()
+
+    df.to_parquet(tmp, index=False)
+
+    if target.is_dir():
+        shutil.rmtree(target)
+    tmp.replace(target)
+
+
+def content_hash(df):
+    """Stable digest of a frame's column names and values (index excluded)."""
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def stored_hash(path):
+    """Content hash recorded in a partition file's footer, or None."""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = metadata.get(HASH_KEY)
+    return raw.decode() if raw else None
+
+
+def partition_years(target):
+    """Years that have a ``Year=<y>`` partition under `target`."""
+    if not target.is_dir():
+        return set()
+    return {int(p.name.split("=", 1)[1]) for p in target.glob("Year=*")}
+
+
+def write_partitions(df, target, years=None):
+    """Write `df` as one Parquet file per Year under `target`.
+
+    Only `years` are written (default: every year of `df`, and partitions
+    of years no longer present are removed). A partition whose content hash
+    matches the one already on disk is skipped. Returns the years rewritten.
+    """
+    if target.exists() and not target.is_dir():
+        target.unlink()
+    target.mkdir(parents=True, exist_ok=True)
+
+    groups = {int(y): part for y, part in df.groupby("Year", sort=True)}
+    if years is None:
+        years = set(groups) | partition_years(target)
+
+    written = []
+    for y in sorted(years):
+        part_dir = target / f"Year={y}"
+        part = groups.get(y)
+        if part is None or part.empty:
+            if part_dir.exists():
+                shutil.rmtree(part_dir)
+                written.append(y)
+            continue
+
+        part = part.drop(columns="Year")
+        for col in part.select_dtypes("category").columns:
+            part[col] = part[col].cat.remove_unused_categories()
+        digest = content_hash(part)
+        path = part_dir / PARTITION_FILE
+        if stored_hash(path) == digest:
+            continue
+
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[HASH_KEY] = digest.encode()
+        table = table.replace_schema_metadata(metadata)
+
+        # File tạm bắt đầu bằng "." để trình đọc dataset bỏ qua
+        part_dir.mkdir(exist_ok=True)
+        tmp = part_dir / f".{PARTITION_FILE}.tmp"
+        pq.write_table(table, tmp)
+        for old in part_dir.glob("*.parquet"):
+            if old.name != PARTITION_FILE:
+                old.unlink()
+        tmp.replace(path)
+        written.append(y)
+    return written
+
+
+def build_dataset(name, source_dir=DATA_DIR, store_dir=STORE_DIR):
+    """Compile one dataset into the store; return its row count or None."""
+    source = find_source(name, source_dir)
+    if source is None:
+        return None
+
+    df = apply_schema(name, normalize(read_source(source)))
+    if name in DAILY_DATASETS:
+        target = store_dir / DATASETS[name]
+        write_partitions(df, target)
+        # Partition không đổi không được ghi lại; đánh dấu thời điểm biên dịch
+        # trên thư mục để core.data.dataset_path so sánh với file gốc
+        os.utime(target)
+    else:
+        write_parquet(df, store_dir / DATASETS[name])
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--store-dir", type=Path, default=STORE_DIR)
+    parser.add_argument("--only", nargs="+", choices=[*DATASETS, "bctc", "scores"])
+    parser.add_argument("--full", action="store_true", help="rescore every year")
+    parser.add_argument("--whole-table", action="store_true",
+                        help="z-scores over the whole table like the dashboard file (rescores every year)")
+    args = parser.parse_args(argv)
+
+    args.store_dir.mkdir(parents=True, exist_ok=True)
+    for name in args.only or [*DATASETS, "bctc"]:
+        start = time.perf_counter()
+        if name == "bctc":
+            rows = build_bctc(args.source_dir, args.store_dir)
+        elif name == "scores":
+            groups = (None, None) if args.whole_table else (RATIO_GROUPS, SCORE_GROUPS)
+            rows = build_scores(args.source_dir, args.store_dir, *groups, full=args.full)
+        else:
+            rows = build_dataset(name, args.source_dir, args.store_dir)
+        elapsed = time.perf_counter() - start
+
+        if rows is None:
+            print(f"{name:>8}: skipped (no source file)")
+        else:
+            print(f"{name:>8}: {rows:>10,} rows in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
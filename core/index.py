@@ -0,0 +1,65 @@
+"""Per-ticker index over daily (Ticker, Date) series.
+
+Rows are sorted once by (Ticker, Date) and the start/stop offset of every
+ticker is recorded, so a ticker plus date range lookup is two binary
+searches and a zero-copy positional slice instead of a full-table scan.
+"""
+import numpy as np
+import pandas as pd
+
+
+def to_datetime64(value):
+    """Convert a date/Timestamp/string to numpy datetime64 (None passes through)."""
+    if value is None:
+        return None
+    return pd.Timestamp(value).to_datetime64()
+
+
+class TickerIndex:
+    """Daily table sorted by (Ticker, Date) with per-ticker row offsets."""
+
+    def __init__(self, df, ticker_col="Ticker", date_col="Date"):
+        valid = df[date_col].notna()
+        if not valid.all():
+            df = df[valid]
+        codes, tickers = pd.factorize(df[ticker_col], sort=True)
+        dates = df[date_col].to_numpy()
+        order = np.lexsort((dates, codes))
+
+        # An already sorted frame (e.g. memory-mapped) is kept without copying
+        if np.array_equal(order, np.arange(len(order))):
+            self.frame = df.reset_index(drop=True)
+            self.dates = dates
+        else:
+            self.frame = df.take(order).reset_index(drop=True)
+            self.dates = dates[order]
+
+        bounds = np.searchsorted(codes[order], np.arange(len(tickers) + 1))
+        self.offsets = {
+            ticker: (int(start), int(stop))
+            for ticker, start, stop in zip(tickers, bounds[:-1], bounds[1:])
+        }
+        self.date_min = self.dates.min() if len(self.dates) else None
+        self.date_max = self.dates.max() if len(self.dates) else None
+        # Cấu trúc thống kê theo khoảng (core.ranges.RangeStats), do load_panel gắn vào
+        self.ranges = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def tickers(self):
+        return list(self.offsets)
+
+    def bounds(self, ticker, start=None, end=None):
+        """Row positions [lo, hi) of `ticker` between `start` and `end` inclusive."""
+        lo, hi = self.offsets.get(ticker, (0, 0))
+        dates = self.dates[lo:hi]
+        first = np.searchsorted(dates, to_datetime64(start), "left") if start is not None else 0
+        last = np.searchsorted(dates, to_datetime64(end), "right") if end is not None else len(dates)
+        return lo + first, lo + max(first, last)
+
+    def lookup(self, ticker, start=None, end=None):
+        """Rows of `ticker` between `start` and `end` inclusive, sorted by date."""
+        lo, hi = self.bounds(ticker, start, end)
+        return self.frame.iloc[lo:hi]
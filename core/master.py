@@ -0,0 +1,89 @@
+"""Master (Ticker, Year) table behind the market overview on Home.py.
+
+Kept free of Streamlit so the same code runs in the page (wrapped in
+``st.cache_resource``) and in headless tools such as the benchmarks. The
+table and its cube are also kept in the on-disk result cache, so a new
+worker or a restart skips the merges as long as the sources are unchanged.
+"""
+from core.aggregates import yearly_stats
+from core.cachestats import record
+from core.cube import FilterCube
+from core.data import fingerprints, load_datasets
+from core.diskcache import disk_cached
+from core.memory import compact
+from core.panel import load_panel
+from core.profiling import profiled
+from core.risk import RISK_VERSION, risk_table
+from core.rules import RULES_VERSION, assessment
+
+# Dataset mà bảng tổng hợp phụ thuộc (khóa của cache trên đĩa)
+MASTER_SOURCES = ("health", "flow", "price", "mcap")
+
+
+@disk_cached("master_table", sources=lambda: fingerprints(*MASTER_SOURCES), version=(RULES_VERSION, RISK_VERSION, 2))
+def master_table():
+    """Return (master table, FilterCube) built from the source datasets."""
+    # Datasets come back already stripped, renamed and date-parsed
+    df_health, df_flow = load_datasets("health", "flow")
+
+    # Year-level aggregates for market KPIs; only changed year partitions are recomputed
+    price_year = yearly_stats("price")
+    mcap_year = yearly_stats("mcap")
+
+    # Master table
+    df = (
+        df_health
+        .merge(df_flow, on=["Ticker", "Year"], how="left")
+        .merge(price_year, on=["Ticker", "Year"], how="left")
+        .merge(mcap_year, on=["Ticker", "Year"], how="left")
+        # Lợi suất, biến động, sụt giảm tối đa, beta (core.risk)
+        .merge(risk_table(), on=["Ticker", "Year"], how="left")
+    )
+
+    # Clean industry column (categorical; placeholder strings become missing)
+    industry = df["Ngành"].astype("category")
+    df["Ngành"] = industry.cat.remove_categories(
+        [c for c in ("nan", "None") if c in industry.cat.categories]
+    )
+
+    # Investment assessment for every ticker-year, evaluated in one vectorized pass
+    df["Nhận định"] = assessment(df)
+
+    # One resident copy per process: categoricals, int16 years, float32 measures
+    df = compact(df, table="master")
+
+    # Pre-aggregated cube for sidebar KPIs and Market Insight charts
+    return df, FilterCube(df)
+
+
+@profiled("build_master")
+def build_master():
+    """Return (master table, daily TickerIndex, FilterCube, rows per year).
+
+    Callers cache the result, so every call counts as a "master" cache miss.
+    """
+    record("master", hit=False)
+    df, cube = master_table()
+
+    # Wide daily panel (Price, MarketCap, Volume, Net.F_Val), indexed by ticker
+    panel_idx = load_panel()
+
+    # Master rows split by year (best Health_Score first) so the sidebar filter
+    # only scans one year and top-N / suggestion tables are plain slices
+    ranked = df.sort_values("Health_Score", ascending=False, kind="stable")
+    year_frames = {y: part for y, part in ranked.groupby("Year")}
+
+    return df, panel_idx, cube, year_frames
+
+
+def filter_rows(dfy, industries, ratings, flags):
+    """Rows of one year's frame matching the sidebar filters.
+
+    Empty industry or rating lists mean "all"; the flow flag filter
+    always applies.
+    """
+    return dfy[
+        (dfy["Ngành"].isin(industries) if len(industries) > 0 else True) &
+        (dfy["Credit_Rating_Z"].isin(ratings) if len(ratings) > 0 else True) &
+        (dfy["Buy_Net_Flag"].isin(flags) if "Buy_Net_Flag" in dfy.columns else True)
+    ]
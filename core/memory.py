@@ -0,0 +1,180 @@
+"""Compact dtypes for resident tables and a per-table memory report.
+
+Usage::
+
+    python -m core.memory                  # bytes per table, before -> after
+    python -m core.memory --columns        # ... and per column
+    python -m core.memory --budget 512     # exit 1 above 512 MB resident
+
+Every table the data layer keeps in memory (datasets, the daily panel,
+the master table) goes through `compact` once when it is built:
+low-cardinality strings become categoricals, other strings Arrow-backed
+``str``, Year ``int16``, integers the smallest type that holds them and
+float64 measures float32 whenever every value survives the round trip
+(within ``FLOAT32_RTOL``, whole numbers exactly). Volume and market cap
+stay float64: their values run far past 2**24, where float32 can no
+longer hold every whole number.
+`compact` records the table's bytes per column before and after, so
+`report` shows what each table costs a worker and what compaction saved.
+"""
+import argparse
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Tăng khi đổi quy tắc hạ kiểu: bảng chia sẻ (core.shared) dựng theo quy tắc cũ bị bỏ
+DTYPES_VERSION = 2
+# Chuỗi có tỷ lệ giá trị khác nhau <= ngưỡng này được lưu dạng category
+CATEGORY_MAX_RATIO = 0.5
+# Sai số tương đối tối đa khi hạ float64 -> float32
+FLOAT32_RTOL = 1e-6
+# Cột luôn giữ float64 (giá trị lớn, cần chính xác đến hàng đơn vị)
+FLOAT64_COLUMNS = {"Volume", "MarketCap"}
+# Ngân sách bộ nhớ mỗi worker (MB) cho --budget mặc định
+BUDGET_MB = float(os.environ.get("DASHBOARD_MEMORY_BUDGET_MB", 0)) or None
+
+_reports = {}  # table -> DataFrame(column, dtype_before, dtype, bytes_before, bytes)
+_lock = threading.Lock()
+
+
+def column_bytes(df):
+    """Deep memory usage per column, index excluded."""
+    return df.memory_usage(index=False, deep=True)
+
+
+def _compact_strings(s):
+    if s.nunique(dropna=True) <= CATEGORY_MAX_RATIO * max(len(s), 1):
+        return s.astype("category")
+    return s.astype("str")
+
+
+def _compact_float(s):
+    values = s.to_numpy("float64")
+    with np.errstate(over="ignore"):
+        small = values.astype("float32")
+    # Số nguyên phải giữ nguyên giá trị, không chỉ sai số tương đối nhỏ
+    whole = np.isfinite(values) & (values == np.round(values))
+    if (np.allclose(small, values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True)
+            and np.array_equal(small[whole], values[whole])):
+        return pd.Series(small, index=s.index, name=s.name)
+    return s
+
+
+def compact_column(s):
+    """Smallest dtype that keeps the values of `s` (see module docstring)."""
+    dtype = s.dtype
+    if s.name == "Year" and pd.api.types.is_numeric_dtype(dtype) and s.notna().all():
+        return s.astype("int16")
+    if isinstance(dtype, pd.StringDtype):
+        return _compact_strings(s)
+    if dtype == object:
+        if pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+            return _compact_strings(s)
+        return s
+    if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+        return s
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(s, downcast="integer")
+    if dtype == "float64" and s.name not in FLOAT64_COLUMNS:
+        return _compact_float(s)
+    return s
+
+
+def compact(df, table=None):
+    """Return `df` with every column cast by `compact_column`.
+
+    With a `table` name, the bytes per column before and after are kept
+    for `report`.
+    """
+    before = column_bytes(df) if table else None
+    dtypes = df.dtypes
+    out = df.copy(deep=False)
+    for col in df.columns:
+        out[col] = compact_column(df[col])
+
+    if table:
+        entry = pd.DataFrame({
+            "column": df.columns,
+            "dtype_before": dtypes.astype(str).to_numpy(),
+            "dtype": out.dtypes.astype(str).to_numpy(),
+            "bytes_before": before.to_numpy(),
+            "bytes": column_bytes(out).to_numpy(),
+        })
+        with _lock:
+            _reports[table] = entry
+    return out
+
+
+def report(columns=False):
+    """Bytes per table (or per table and column) before and after `compact`."""
+    with _lock:
+        entries = {name: entry.copy() for name, entry in _reports.items()}
+    if not entries:
+        return pd.DataFrame(columns=["table", "bytes_before", "bytes", "saved_pct"])
+
+    detail = pd.concat(entries, names=["table"]).reset_index(level=0)
+    if columns:
+        out = detail
+    else:
+        out = detail.groupby("table", sort=False)[["bytes_before", "bytes"]].sum().reset_index()
+    out = out.assign(saved_pct=(1 - out["bytes"] / out["bytes_before"]) * 100)
+    return out.reset_index(drop=True)
+
+
+def over_budget(table_report, budget_mb):
+    """Total resident MB of `table_report` if it exceeds `budget_mb`, else None."""
+    total = table_report["bytes"].sum() / 2**20
+    return total if budget_mb and total > budget_mb else None
+
+
+def load_all():
+    """Build every resident table the way the pages do.
+
+    Sharing and the disk cache are turned off so every table is built here
+    and measured before and after compaction.
+    """
+    from core import diskcache, shared
+    from core.data import DATASETS, load_dataset
+    from core.master import build_master
+    from core.panel import PANEL_COLUMNS
+
+    shared.ENABLED = diskcache.ENABLED = False
+
+    for name in DATASETS:
+        if name not in PANEL_COLUMNS:
+            load_dataset(name)
+    build_master()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--columns", action="store_true", help="break down per column")
+    parser.add_argument("--budget", type=float, default=BUDGET_MB, help="MB per worker")
+    args = parser.parse_args(argv)
+
+    # Run as __main__, this file is a second module object; the data layer
+    # records into the importable core.memory
+    from core import memory
+
+    memory.load_all()
+    tables = memory.report()
+    pd.set_option("display.width", 160)
+    shown = memory.report(columns=True) if args.columns else tables.copy()
+    for col in ("bytes_before", "bytes"):
+        shown[col] = shown[col] / 2**20
+    print(shown.rename(columns={"bytes_before": "MB_before", "bytes": "MB"}).round(2).to_string(index=False))
+
+    total_before = tables["bytes_before"].sum() / 2**20
+    total = tables["bytes"].sum() / 2**20
+    print(f"\ntotal: {total_before:,.1f} MB -> {total:,.1f} MB")
+    exceeded = over_budget(tables, args.budget)
+    if exceeded is not None:
+        print(f"OVER BUDGET: {exceeded:,.1f} MB > {args.budget:,.1f} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
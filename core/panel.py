@@ -0,0 +1,87 @@
+"""Wide daily panel: one row per (Ticker, Date) for every daily series.
+
+Price, market cap, volume and foreign net flow share the same keys, so
+they are outer-joined once at load time into a single compact table and
+indexed by ticker. One lookup then serves every detail chart on both
+pages, and the key columns are stored once instead of four times. The
+index carries the range structures of core.ranges, so date-range
+statistics of a ticker need no scan either.
+"""
+import threading
+
+import pandas as pd
+
+from core.cachestats import record
+from core.data import fingerprints, read_dataset
+from core.index import TickerIndex
+from core.memory import FLOAT64_COLUMNS, compact
+from core.profiling import profiled
+from core.ranges import RangeStats
+from core.shared import shared_table
+
+# Dataset -> cột giá trị trong panel
+PANEL_COLUMNS = {
+    "price": "Price",
+    "mcap": "MarketCap",
+    "volume": "Volume",
+    "ft": "Net.F_Val",
+}
+
+_cache = {}  # dataset names -> (fingerprints, TickerIndex)
+_lock = threading.Lock()
+
+
+def build_panel(frames):
+    """Outer-join long daily frames into one wide (Ticker, Date) panel.
+
+    `frames` maps a value column name to a frame holding Ticker, Date and
+    that column. Duplicate keys keep their last row, as a join would.
+    """
+    series = []
+    for col, df in frames.items():
+        df = df[df["Date"].notna() & df["Ticker"].notna()]
+        df = df.drop_duplicates(["Ticker", "Date"], keep="last")
+        keys = pd.MultiIndex.from_arrays(
+            [df["Ticker"].astype(str).to_numpy(), df["Date"].to_numpy()],
+            names=["Ticker", "Date"],
+        )
+        dtype = "float64" if col in FLOAT64_COLUMNS else "float32"
+        series.append(pd.Series(df[col].to_numpy(dtype), index=keys, name=col))
+
+    panel = pd.concat(series, axis=1, join="outer").reset_index()
+    panel["Ticker"] = panel["Ticker"].astype("category")
+    panel["Year"] = panel["Date"].dt.year.astype("int16")
+    return panel
+
+
+@profiled("load_panel")
+def load_panel(names=tuple(PANEL_COLUMNS)):
+    """Return the process-wide TickerIndex over the wide daily panel.
+
+    The panel is rebuilt only when one of the source files changes. The raw
+    long tables are read without caching, so only the panel stays resident,
+    sorted and memory-mapped from the shared store (see core.shared).
+    """
+    key = fingerprints(*names)
+    entry = _cache.get(names)
+    if entry is not None and entry[0] == key:
+        record("panel", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get(names)
+        if entry is None or entry[0] != key:
+            record("panel", hit=False)
+
+            def build():
+                frames = {PANEL_COLUMNS[name]: read_dataset(name) for name in names}
+                return TickerIndex(compact(build_panel(frames), table="panel")).frame
+
+            # Khung đã sắp theo (Ticker, Date) nên TickerIndex dùng lại bộ đệm đã map
+            panel = shared_table("panel-" + "-".join(names), key, build)
+            index = TickerIndex(panel)
+            if {"Price", "MarketCap", "Volume"}.issubset(panel.columns):
+                index.ranges = RangeStats(index)
+            entry = (key, index)
+            _cache[names] = entry
+    return entry[1]
@@ -0,0 +1,173 @@
+"""Nearest peers of a ticker-year in z-score space.
+
+Usage::
+
+    python -m core.peers                    # build (or reload) the index, time queries
+    python -m core.peers --ticker VNM --year 2024 --same-industry
+
+Every ticker-year of the health table is a point whose coordinates are
+its ratio z-scores (ROA_z, ROE_z, Current Ratio_z, ...); a missing z-score
+counts as the market average, 0. For each year a scikit-learn BallTree is
+built over all companies, plus one per industry for searches restricted
+to the same Ngành, so a query is a tree lookup instead of a distance scan.
+
+The trees are saved with joblib under ``store/models/`` together with
+the fingerprint of the health file they were built from. A new worker
+loads them from there; only a changed health file (or a new
+``PEERS_VERSION``) rebuilds them.
+"""
+import argparse
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from core.cachestats import record
+from core.data import MODEL_DIR, fingerprint, load_dataset
+from core.rules import Z_SCORE_COLUMNS
+
+# Tăng khi đổi cách dựng chỉ mục để file cũ bị bỏ qua
+PEERS_VERSION = 1
+PEERS_FILE = "peers.joblib"
+# Chỉ các z-score của tỷ số; Health_Z là điểm tổng hợp từ chính các tỷ số này
+PEER_FEATURES = [col for _, col in Z_SCORE_COLUMNS if col != "Health_Z"]
+PEER_COLUMNS = ["Ticker", "Tên công ty", "Ngành", "Health_Score", "Credit_Rating_Z"]
+LEAF_SIZE = 40
+
+_cache = {}  # "peers" -> (key, PeerIndex)
+_lock = threading.Lock()
+
+
+class YearPeers:
+    """BallTrees over one year's z-score vectors: all companies and per industry."""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.points = np.nan_to_num(self.frame[PEER_FEATURES].to_numpy("float64"), nan=0.0)
+        self.rows = {ticker: i for i, ticker in enumerate(self.frame["Ticker"].astype(str))}
+        self.tree = BallTree(self.points, leaf_size=LEAF_SIZE)
+
+        # Cây riêng cho từng ngành (ngành trống cũng là một nhóm):
+        # mã ngành -> (vị trí dòng trong năm, cây trên các dòng đó)
+        self.industry, _ = pd.factorize(self.frame["Ngành"], use_na_sentinel=False)
+        self.industries = {}
+        for code in np.unique(self.industry):
+            rows = np.flatnonzero(self.industry == code)
+            self.industries[code] = (rows, BallTree(self.points[rows], leaf_size=LEAF_SIZE))
+
+    def nearest(self, ticker, k, same_industry=False):
+        """(row positions, distances) of the `k` nearest peers of `ticker`."""
+        row = self.rows.get(ticker)
+        if row is None:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        rows, tree = None, self.tree
+        if same_industry:
+            rows, tree = self.industries[self.industry[row]]
+        # k + 1: bản thân doanh nghiệp luôn là điểm gần nhất
+        dist, found = tree.query(self.points[row:row + 1], k=min(k + 1, tree.data.shape[0]))
+        dist, found = dist[0], found[0]
+        if rows is not None:
+            found = rows[found]
+        # Điểm trùng tọa độ có thể đẩy bản thân ra khỏi k + 1 kết quả: vẫn chỉ trả k
+        keep = found != row
+        return found[keep][:k], dist[keep][:k]
+
+
+class PeerIndex:
+    """Per-year peer trees over the health table."""
+
+    def __init__(self, df):
+        self.years = {int(year): YearPeers(part) for year, part in df.groupby("Year", sort=True)}
+
+    def similar(self, ticker, year, k=5, same_industry=False):
+        """The `k` ticker-years of `year` closest to `ticker`, nearest first."""
+        peers = self.years.get(int(year))
+        if peers is None:
+            return pd.DataFrame(columns=[*PEER_COLUMNS, "Khoảng cách", *PEER_FEATURES])
+        rows, dist = peers.nearest(ticker, k, same_industry)
+        out = peers.frame.take(rows)[[*PEER_COLUMNS, *PEER_FEATURES]].reset_index(drop=True)
+        out.insert(len(PEER_COLUMNS), "Khoảng cách", dist)
+        return out
+
+
+def peers_path():
+    return MODEL_DIR / PEERS_FILE
+
+
+def build_peer_index(key):
+    """Build the index from the health table and save it for `key`."""
+    index = PeerIndex(load_dataset("health"))
+    path = peers_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        joblib.dump({"key": key, "index": index}, tmp)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return index
+
+
+def _read_peer_index(key):
+    try:
+        saved = joblib.load(peers_path())
+    except (OSError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+    return saved["index"] if isinstance(saved, dict) and saved.get("key") == key else None
+
+
+def load_peer_index():
+    """Process-wide PeerIndex: kept in memory, else loaded from disk, else built."""
+    key = (fingerprint("health"), PEERS_VERSION)
+    entry = _cache.get("peers")
+    if entry is not None and entry[0] == key:
+        record("peers", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get("peers")
+        if entry is None or entry[0] != key:
+            record("peers", hit=False)
+            index = _read_peer_index(key) or build_peer_index(key)
+            entry = (key, index)
+            _cache["peers"] = entry
+    return entry[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticker")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--same-industry", action="store_true")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the saved index")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.rebuild:
+        build_peer_index((fingerprint("health"), PEERS_VERSION))
+    index = load_peer_index()
+    print(f"index ready in {time.perf_counter() - start:.2f}s -> {peers_path()}")
+
+    if args.ticker:
+        year = args.year or max(index.years)
+        print(index.similar(args.ticker, year, args.k, args.same_industry).to_string(index=False))
+        return
+
+    # Thời gian truy vấn trung bình trên mọi doanh nghiệp của năm mới nhất
+    year = args.year or max(index.years)
+    tickers = list(index.years[year].rows)
+    start = time.perf_counter()
+    for ticker in tickers:
+        index.similar(ticker, year, args.k, args.same_industry)
+    elapsed = (time.perf_counter() - start) / max(len(tickers), 1)
+    print(f"{len(tickers):,} queries in {year}: {elapsed * 1000:.2f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
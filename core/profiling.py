@@ -0,0 +1,280 @@
+"""Opt-in per-section profiling of page reruns.
+
+Enabled for every session with ``DASHBOARD_PROFILE=1`` or for one session
+by opening the page with ``?profile=1``. A page calls `start` once, then
+``prof.mark("LỚP n – ...")`` at each layer header; every section between
+two marks records its wall time, traced memory (net allocation and peak,
+via tracemalloc) and the rows it processed. Functions decorated with
+`profiled` (the cached loaders in ``core``) are recorded on each call as
+well. `finish` shows the records in a collapsible diagnostics panel and
+appends them to the metrics file:
+
+* ``jsonl`` (default): one JSON object per record, appended to
+  ``metrics/profile.jsonl`` and rotated to ``.1`` past
+  ``DASHBOARD_PROFILE_MAX_BYTES``;
+* ``prom``: cumulative counters in Prometheus text format, rewritten to
+  ``metrics/dashboard.prom`` for a textfile collector to scrape.
+
+Select the format with ``DASHBOARD_PROFILE_FORMAT`` and the path with
+``DASHBOARD_PROFILE_FILE``. Memory figures are process-wide and therefore
+approximate while several sessions rerun at once; tracemalloc also slows
+allocation-heavy work (cold loads) several times while it is on, so
+compare timings of profiled runs with each other only.
+
+tracemalloc runs while any profiler of the process is running. A run cut
+short by an error, ``st.stop`` or a rerun never reaches `finish`; the next
+`start` (of any page, profiled or not) drops such profilers, so tracing
+stops once no run is being profiled. A fragment-only rerun does not run
+the page's `start` and `finish`: bodies of ``st.fragment`` functions take
+their profiler from `fragment`, which records such a rerun on its own.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+ENABLED = os.environ.get("DASHBOARD_PROFILE", "") not in ("", "0")
+METRICS_FORMAT = os.environ.get("DASHBOARD_PROFILE_FORMAT", "jsonl")
+METRICS_DIR = Path(__file__).resolve().parent.parent / "metrics"
+METRICS_FILE = Path(
+    os.environ.get("DASHBOARD_PROFILE_FILE")
+    or METRICS_DIR / ("dashboard.prom" if METRICS_FORMAT == "prom" else "profile.jsonl")
+)
+MAX_BYTES = int(os.environ.get("DASHBOARD_PROFILE_MAX_BYTES", 10 * 2**20))
+
+_local = threading.local()
+_lock = threading.Lock()
+_running = {}  # luồng -> Profiler chưa kết thúc; tracemalloc chỉ bật khi khác rỗng
+_totals = defaultdict(lambda: [0, 0.0, 0, 0])  # (page, kind, name) -> calls, seconds, rows, peak
+
+
+def _rows(value):
+    """Row count of a result (DataFrame, index, or first item of a tuple)."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _memory():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every method is a no-op."""
+
+    enabled = False
+    records = ()
+
+    def mark(self, name):
+        pass
+
+    def rows(self, n):
+        pass
+
+
+class Profiler:
+    """Section and function records of one script run."""
+
+    enabled = True
+
+    def __init__(self, page):
+        self.page = page
+        self.thread = threading.get_ident()
+        self.run_id = f"{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+        self.records = []
+        self._section = None
+        self._done = False
+
+    def _open(self, kind, name):
+        tracemalloc.reset_peak()
+        return {
+            "kind": kind, "name": name, "rows": 0,
+            "_t0": time.perf_counter(), "_m0": _memory(),
+        }
+
+    def _close(self, record):
+        current, peak = tracemalloc.get_traced_memory()
+        record["wall_ms"] = (time.perf_counter() - record.pop("_t0")) * 1000
+        start = record.pop("_m0")
+        record["alloc_kb"] = (current - start) / 1024
+        record["peak_kb"] = max(peak - start, 0) / 1024
+        self.records.append(record)
+
+    def mark(self, name):
+        """End the current section and start section `name`."""
+        if self._done:
+            return
+        if self._section is not None:
+            self._close(self._section)
+        self._section = self._open("section", name)
+
+    def rows(self, n):
+        """Add `n` processed rows to the current section."""
+        if self._section is not None and n:
+            self._section["rows"] += int(n)
+
+    def call(self, name, fn, args, kwargs):
+        """Run fn(*args, **kwargs) and record it as a function entry."""
+        record = self._open("function", name)
+        result = fn(*args, **kwargs)
+        record["rows"] = _rows(result)
+        self._close(record)
+        return result
+
+    def stop(self):
+        """Close the last section; return all records of the run."""
+        if not self._done:
+            if self._section is not None:
+                self._close(self._section)
+                self._section = None
+            self._done = True
+        return self.records
+
+
+def _drop_abandoned():
+    """Stop profilers whose run ended without `finish`; call with `_lock` held."""
+    # Luồng hiện tại bắt đầu lần chạy mới, luồng đã kết thúc không còn chạy gì
+    current = threading.get_ident()
+    alive = {thread.ident for thread in threading.enumerate()}
+    abandoned = [ident for ident in _running if ident == current or ident not in alive]
+    for ident in abandoned:
+        _running.pop(ident).stop()
+    if abandoned and not _running and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def start(page, enabled=False):
+    """Start profiling this run of `page` if enabled here or via the env."""
+    if _running:
+        with _lock:
+            _drop_abandoned()
+    if not (enabled or ENABLED):
+        return NullProfiler()
+
+    prof = Profiler(page)
+    with _lock:
+        if not _running and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _running[prof.thread] = prof
+    _local.profiler = prof
+    return prof
+
+
+@contextmanager
+def fragment(prof, name):
+    """Profiler for one run of a fragment body of `prof`'s page.
+
+    During a full run the body executes inline and records into `prof`. On
+    a fragment-only rerun `prof` finished with the last full run, so a new
+    profiler records the body as section `name` and is finished when the
+    body exits.
+    """
+    if not prof.enabled or not prof._done:
+        yield prof
+        return
+    own = start(prof.page, enabled=True)
+    own.mark(name)
+    try:
+        yield own
+    finally:
+        finish(own)
+
+
+def profiled(name):
+    """Decorator recording each call of a function in the active profiler.
+
+    A leading string argument (a dataset name) is added to the record name.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            prof = getattr(_local, "profiler", None)
+            if prof is None or prof._done:
+                return fn(*args, **kwargs)
+            label = f"{name}({args[0]})" if args and isinstance(args[0], str) else name
+            return prof.call(label, fn, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_jsonl(prof, path=METRICS_FILE):
+    """Append the run's records to a JSONL file, rotating it when too big."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists() and path.stat().st_size > MAX_BYTES:
+        path.replace(path.with_name(path.name + ".1"))
+    ts = time.time()
+    with path.open("a", encoding="utf-8") as f:
+        for record in prof.records:
+            line = {"ts": ts, "page": prof.page, "run_id": prof.run_id, **record}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+def write_prometheus(path=METRICS_FILE):
+    """Rewrite the cumulative counters in Prometheus text format."""
+    metrics = [
+        ("dashboard_section_calls_total", "counter", "Runs of a section or calls of a profiled function.", 0),
+        ("dashboard_section_seconds_total", "counter", "Wall time spent in a section or function.", 1),
+        ("dashboard_section_rows_total", "counter", "Rows processed by a section or function.", 2),
+        ("dashboard_section_peak_bytes", "gauge", "Largest traced memory peak of a section or function.", 3),
+    ]
+    lines = []
+    for metric, kind, help_text, i in metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for (page, rec_kind, name), values in sorted(_totals.items()):
+            labels = f'page="{_label(page)}",kind="{rec_kind}",name="{_label(name)}"'
+            lines.append(f"{metric}{{{labels}}} {values[i]}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def render_panel(prof):
+    """Collapsible diagnostics panel with the run's records."""
+    import pandas as pd
+    import streamlit as st
+
+    table = pd.DataFrame(prof.records, columns=["kind", "name", "wall_ms", "alloc_kb", "peak_kb", "rows"])
+    total = table.loc[table["kind"] == "section", "wall_ms"].sum()
+    with st.expander(f"Chẩn đoán hiệu năng – {total:,.0f} ms", expanded=False):
+        st.dataframe(table.round(2), use_container_width=True, hide_index=True)
+        st.caption(f"Ghi vào {METRICS_FILE} ({METRICS_FORMAT})")
+
+
+def finish(prof):
+    """Stop `prof`, show the diagnostics panel and write the metrics file."""
+    if not prof.enabled or prof._done:
+        return
+    prof.stop()
+    _local.profiler = None
+
+    with _lock:
+        for record in prof.records:
+            totals = _totals[(prof.page, record["kind"], record["name"])]
+            totals[0] += 1
+            totals[1] += record["wall_ms"] / 1000
+            totals[2] += record["rows"] or 0
+            totals[3] = max(totals[3], record["peak_kb"] * 1024)
+        if METRICS_FORMAT == "prom":
+            write_prometheus()
+        else:
+            write_jsonl(prof)
+        if _running.get(prof.thread) is prof:
+            del _running[prof.thread]
+        if not _running and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    render_panel(prof)
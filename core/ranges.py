@@ -0,0 +1,149 @@
+"""Constant-time aggregates of a ticker's daily series over any date range.
+
+The daily panel (core.panel) keeps every ticker's rows contiguous and
+sorted by date, so a (ticker, start, end) range is a row interval
+[lo, hi) found by `TickerIndex.bounds`. Over those rows, built once when
+the panel is loaded:
+
+- `PrefixSums`: running sums (and counts of non-missing values), so a sum
+  or mean is two array reads;
+- `SparseTable`: minima or maxima of blocks of 2**k blocks plus the
+  running extrema inside each block, so a min or max is at most four
+  array reads (ranges inside one block scan at most ``BLOCK`` values).
+
+`RangeStats.summary` combines them into the company card's statistics,
+the VWAP, and the return and annualized volatility of daily log returns,
+without scanning the rows of the range. Each return is taken against the
+last earlier price of the same ticker, so a day without a price neither
+drops nor splits a return, and the returns of a range add up to the move
+from its first to its last price.
+"""
+import numpy as np
+
+# Số dòng mỗi khối của SparseTable
+BLOCK = 64
+TRADING_DAYS = 252
+
+
+class PrefixSums:
+    """Running sum and non-missing count of one column."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype="float64")
+        valid = ~np.isnan(values)
+        self.sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+        # Không có giá trị thiếu: số phần tử chính là độ dài khoảng
+        self.counts = None if valid.all() else np.concatenate([[0], np.cumsum(valid, dtype=np.int32)])
+
+    def count(self, lo, hi):
+        return hi - lo if self.counts is None else int(self.counts[hi] - self.counts[lo])
+
+    def sum(self, lo, hi):
+        return self.sums[hi] - self.sums[lo]
+
+    def mean(self, lo, hi):
+        n = self.count(lo, hi)
+        return self.sum(lo, hi) / n if n else np.nan
+
+
+class SparseTable:
+    """Range minimum (``np.fmin``) or maximum (``np.fmax``) ignoring NaN."""
+
+    def __init__(self, values, func=np.fmin, block=BLOCK):
+        self.func = func
+        self.block = block
+        self.values = np.asarray(values)
+        n = len(self.values)
+        padded = np.full(-(-n // block) * block, np.nan, dtype=self.values.dtype)
+        padded[:n] = self.values
+        blocks = padded.reshape(-1, block)
+
+        # Cực trị tích lũy trong khối, từ đầu khối và từ cuối khối
+        self.prefix = func.accumulate(blocks, axis=1).ravel()[:n]
+        self.suffix = func.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:n]
+
+        # levels[k][b] = cực trị của các khối b .. b + 2**k - 1
+        self.levels = [func.reduce(blocks, axis=1)] if n else []
+        while self.levels and 2 ** len(self.levels) <= len(self.levels[0]):
+            prev, step = self.levels[-1], 2 ** (len(self.levels) - 1)
+            self.levels.append(func(prev[:-step], prev[step:]))
+
+    def query(self, lo, hi):
+        """Extremum of rows [lo, hi); NaN if the range is empty or all missing."""
+        if hi <= lo:
+            return np.nan
+        last = hi - 1
+        first_block, last_block = lo // self.block, last // self.block
+        if first_block == last_block:
+            return self.func.reduce(self.values[lo:hi])
+
+        result = self.func(self.suffix[lo], self.prefix[last])
+        if last_block - first_block > 1:
+            a, b = first_block + 1, last_block
+            k = int(b - a).bit_length() - 1
+            level = self.levels[k]
+            result = self.func(result, self.func(level[a], level[b - 2 ** k]))
+        return result
+
+
+class RangeStats:
+    """Range structures over the Price, MarketCap and Volume rows of a TickerIndex."""
+
+    def __init__(self, index):
+        self.index = index
+        frame = index.frame
+        price = frame["Price"].to_numpy("float64")
+        volume = frame["Volume"].to_numpy("float64")
+
+        self.price = PrefixSums(price)
+        self.price_min = SparseTable(frame["Price"].to_numpy(), np.fmin)
+        self.price_max = SparseTable(frame["Price"].to_numpy(), np.fmax)
+        self.mcap = PrefixSums(frame["MarketCap"].to_numpy())
+
+        # VWAP chỉ tính trên các ngày có cả giá và khối lượng
+        traded = ~np.isnan(price) & ~np.isnan(volume)
+        self.value_traded = PrefixSums(np.where(traded, price * volume, np.nan))
+        self.volume = PrefixSums(np.where(traded, volume, np.nan))
+
+        # Lợi suất log của mỗi ngày có giá so với ngày có giá gần nhất trước đó của
+        # cùng mã; ngày thiếu giá và ngày có giá đầu tiên của mỗi mã không có
+        n = len(price)
+        rows = np.arange(n)
+        valid = ~np.isnan(price)
+        previous = np.full(n, -1)
+        previous[1:] = np.maximum.accumulate(np.where(valid, rows, -1))[:-1]
+        starts = np.sort([start for start, _ in index.offsets.values()])
+        ticker_start = starts[np.searchsorted(starts, rows, side="right") - 1] if len(starts) else rows
+        paired = valid & (previous >= ticker_start)
+        returns = np.full(n, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[paired] = np.log(price[paired] / price[previous[paired]])
+        returns[~np.isfinite(returns)] = np.nan
+        self.returns = PrefixSums(returns)
+        # Dòng có giá đầu tiên tại hoặc sau mỗi dòng (n nếu không còn): gốc lợi suất của khoảng
+        self.next_priced = np.minimum.accumulate(np.where(valid, rows, n)[::-1])[::-1]
+        self.returns_sq = PrefixSums(returns * returns)
+
+    def summary(self, ticker, start=None, end=None):
+        """Statistics of `ticker` between `start` and `end` inclusive (NaN when empty)."""
+        lo, hi = self.index.bounds(ticker, start, end)
+        # Các lợi suất sau ngày có giá đầu tiên của khoảng nối tiếp nhau:
+        # tổng log là log(giá cuối / giá đầu) của khoảng
+        first = self.next_priced[lo] if hi > lo else hi
+        n = self.returns.count(first + 1, hi) if first < hi else 0
+        log_return = self.returns.sum(first + 1, hi) if first < hi else np.nan
+        variance = np.nan
+        if n > 1:
+            mean = log_return / n
+            variance = max((self.returns_sq.sum(first + 1, hi) - n * mean * mean) / (n - 1), 0.0)
+        volume = self.volume.sum(lo, hi)
+        return {
+            "Rows": hi - lo,
+            "Avg_Price": self.price.mean(lo, hi),
+            "Max_Price": self.price_max.query(lo, hi),
+            "Min_Price": self.price_min.query(lo, hi),
+            "Avg_MarketCap": self.mcap.mean(lo, hi),
+            "VWAP": self.value_traded.sum(lo, hi) / volume if volume > 0 else np.nan,
+            "Return": np.expm1(log_return),
+            "Volatility": np.sqrt(variance * TRADING_DAYS),
+        }
@@ -0,0 +1,207 @@
+"""Headless batch of per-company HTML reports for every ticker-year.
+
+Usage::
+
+    python -m core.report                          # every ticker-year -> reports/
+    python -m core.report --years 2024 --workers 8
+    python -m core.report --tickers VNM FPT --plotlyjs cdn
+
+Each report holds what pages/Phan_loai_dau_tu.py shows for one ticker and
+year: the BCTC table, the health table, the Z-score and market-risk
+cards, the narrative, the foreign-flow charts and the warnings, built by
+the same functions in ``core.company``. Reports are rendered on a process pool. The data is
+loaded once in the parent before the pool forks, and each worker reuses
+it (or maps the shared Arrow store when processes are spawned), so no
+ticker triggers a reload. Charts reference one ``plotly.min.js`` written
+next to the reports unless ``--plotlyjs cdn`` or ``inline`` is given.
+"""
+import argparse
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from core.company import (
+    BCTC_DETAIL_COLUMNS, PAGE_CSS, alert_boxes, analysis_html, bctc_detail, flow_daily_view,
+    flow_year_view, health_table, risk_cards, score_cards, warnings_and_suggestions,
+)
+
+OUTPUT_DIR = Path("reports")
+BATCH_SIZE = 50
+PLOTLYJS = {"directory": "directory", "cdn": "cdn", "inline": True}
+
+_inputs = None  # dữ liệu dùng chung của tiến trình (xem load_inputs)
+
+
+def load_inputs():
+    """Load everything a report needs once per process, grouped by ticker."""
+    global _inputs
+    if _inputs is None:
+        from core.bctc import load_bctc
+        from core.data import load_datasets
+        from core.panel import load_panel
+        from core.risk import load_risk
+
+        health, flow = load_datasets("health", "flow")
+        bctc = load_bctc(["MÃ", *BCTC_DETAIL_COLUMNS])
+        _inputs = {
+            "health": {key: rows for key, rows in health.groupby(["Ticker", "Year"], observed=True)},
+            "flow": {t: rows for t, rows in flow.groupby("Ticker", observed=True)},
+            "bctc": {t: rows for t, rows in bctc.groupby("MÃ", observed=True)} if not bctc.empty else {},
+            "panel": load_panel(),
+            "risk": load_risk(),
+            "empty_flow": flow.iloc[:0],
+            "empty_bctc": bctc.iloc[:0],
+        }
+    return _inputs
+
+
+def report_tasks(tickers=None, years=None):
+    """Sorted (ticker, year) pairs that have a health row."""
+    keys = load_inputs()["health"]
+    return sorted(
+        (str(t), int(y)) for t, y in keys
+        if (not tickers or t in tickers) and (not years or y in years)
+    )
+
+
+def _section(title):
+    return f"<div class='section'>{html.escape(title)}</div>"
+
+
+def render_report(ticker, year, plotlyjs="directory"):
+    """HTML document of the investor view for one ticker-year."""
+    data = load_inputs()
+    health_data = data["health"][(ticker, year)]
+    info = health_data.iloc[0]
+    flow_year_data = data["flow"].get(ticker, data["empty_flow"])
+    flow_daily_data = data["panel"].lookup(ticker, f"{year}-01-01", f"{year}-12-31")
+    bctc_data = bctc_detail(data["bctc"].get(ticker, data["empty_bctc"]), ticker)
+
+    parts = [f"<h1 class='title'>PHÂN TÍCH DOANH NGHIỆP – {html.escape(ticker)} ({year})</h1>"]
+
+    parts.append(_section("Bảng chỉ tiêu tài chính chi tiết"))
+    if not bctc_data.empty:
+        parts.append(bctc_data.to_html(index=False, float_format="{:,.2f}".format, na_rep=""))
+    else:
+        parts.append("<p>Không có dữ liệu chỉ tiêu tài chính chi tiết cho mã cổ phiếu này.</p>")
+
+    parts.append(_section("Tình hình sức khỏe tài chính"))
+    parts.append(health_table(health_data).to_html(index=False, float_format="{:,.2f}".format, na_rep=""))
+
+    parts.append(_section("Kết luận nhanh sức khỏe doanh nghiệp"))
+    parts.append("<div class='cards'>" + "".join(score_cards(info)) + "</div>")
+
+    parts.append(_section("Rủi ro thị trường trong năm"))
+    risk = data["risk"].loc[(ticker, year)] if (ticker, year) in data["risk"].index else None
+    parts.append("<div class='cards'>" + "".join(risk_cards(risk)) + "</div>")
+
+    parts.append(_section("Giải thích điểm sức khỏe"))
+    parts.append(analysis_html(info))
+
+    # Biểu đồ đầu tiên nạp plotly.js, các biểu đồ sau dùng lại
+    include = PLOTLYJS[plotlyjs]
+    parts.append(_section("Dòng tiền nhà đầu tư nước ngoài"))
+    for view, empty in (
+        (flow_year_view(flow_year_data, ticker), "Không có dữ liệu dòng tiền theo năm cho doanh nghiệp này."),
+        (flow_daily_view(flow_daily_data, ticker, year), "Không có dữ liệu dòng tiền theo ngày cho doanh nghiệp này."),
+    ):
+        if view is None:
+            parts.append(f"<p>{empty}</p>")
+            continue
+        fig, comment = view
+        parts.append(fig.to_html(full_html=False, include_plotlyjs=include))
+        parts.append(comment)
+        include = False
+
+    parts.append(_section("Cảnh báo & Gợi ý đầu tư"))
+    parts.extend(alert_boxes(*warnings_and_suggestions(info)))
+
+    return f"""<!DOCTYPE html>
+<html lang="vi">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(ticker)} {year} – Phân tích doanh nghiệp</title>
+{PAGE_CSS}
+<style>
+body {{ font-family: sans-serif; max-width: 1200px; margin: 0 auto; padding: 16px; }}
+.cards {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px; }}
+table {{ border-collapse: collapse; background: #ffffff; color: #0f172a; font-size: 13px; }}
+th, td {{ border: 1px solid #e5e7eb; padding: 4px 8px; text-align: right; }}
+</style>
+</head>
+<body>
+{"".join(parts)}
+</body>
+</html>
+"""
+
+
+def report_path(out_dir, ticker, year):
+    return out_dir / f"{ticker}_{year}.html"
+
+
+def render_batch(batch, out_dir, plotlyjs):
+    """Render and write a batch of (ticker, year) reports; return their count."""
+    for ticker, year in batch:
+        page = render_report(ticker, year, plotlyjs)
+        report_path(out_dir, ticker, year).write_text(page, encoding="utf-8")
+    return len(batch)
+
+
+def write_index(out_dir, tasks):
+    """index.html linking every report, one line per year."""
+    years = {}
+    for ticker, year in tasks:
+        years.setdefault(year, []).append(
+            f"<a href='{report_path(Path(), ticker, year)}'>{html.escape(ticker)}</a>"
+        )
+    body = "".join(f"<h2>{year}</h2><p>{' '.join(links)}</p>" for year, links in sorted(years.items()))
+    (out_dir / "index.html").write_text(
+        f"<!DOCTYPE html><html lang='vi'><head><meta charset='utf-8'><title>Báo cáo doanh nghiệp</title></head>"
+        f"<body>{body}</body></html>",
+        encoding="utf-8",
+    )
+
+
+def generate(out_dir=OUTPUT_DIR, tickers=None, years=None, workers=None, plotlyjs="directory"):
+    """Write every report under `out_dir`; return (count, seconds)."""
+    start = time.perf_counter()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Nạp trước khi tạo pool: các worker (fork) kế thừa dữ liệu đã nạp
+    tasks = report_tasks(tickers, years)
+    if plotlyjs == "directory":
+        from plotly.offline import get_plotlyjs
+        (out_dir / "plotly.min.js").write_text(get_plotlyjs(), encoding="utf-8")
+
+    batches = [tasks[i:i + BATCH_SIZE] for i in range(0, len(tasks), BATCH_SIZE)]
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_inputs) as pool:
+        futures = [pool.submit(render_batch, batch, out_dir, plotlyjs) for batch in batches]
+        for future in as_completed(futures):
+            done += future.result()
+            elapsed = time.perf_counter() - start
+            print(f"\r{done:>7,} / {len(tasks):,} reports  {done / elapsed:7.1f} reports/s", end="", flush=True)
+    print()
+
+    write_index(out_dir, tasks)
+    return done, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--tickers", nargs="+")
+    parser.add_argument("--years", type=int, nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--plotlyjs", choices=list(PLOTLYJS), default="directory")
+    args = parser.parse_args(argv)
+
+    count, elapsed = generate(args.output, args.tickers, args.years, args.workers, args.plotlyjs)
+    print(f"{count:,} reports in {elapsed:.1f}s ({count / elapsed:.1f} reports/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Risk metrics of every ticker-year from the daily panel, in one vectorized pass.
+
+Usage::
+
+    python -m core.risk              # build (or reload) the table, print a summary
+
+The wide daily panel (core.panel) is sorted by (Ticker, Date), so every
+ticker, and every (Ticker, Year) inside it, is a contiguous run of rows.
+All metrics are computed over whole columns:
+
+- daily returns, each against the last earlier price of the same ticker
+  (a day without a price is skipped, not charged two missing returns),
+  with the first priced row of each ticker left missing;
+- a cap-weighted market return per date, each stock weighted by its
+  market cap on the day its return starts from, summed with
+  ``np.bincount`` over date codes;
+- a 20-day rolling volatility from running sums of returns and squared
+  returns (a window never crosses into another ticker);
+- per (Ticker, Year) run, sums via ``np.add.reduceat`` give the annual
+  return, the annualized volatility and the beta against the market;
+  the maximum drawdown comes from a per-run running peak.
+
+The result has the grain of the health table. It is merged into the master
+table (Home.py) and read by the investor page, cached in memory and in
+``core.diskcache`` against the price and market cap files.
+"""
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.cachestats import record
+from core.data import fingerprints
+from core.diskcache import disk_cached
+from core.panel import load_panel
+
+# Tăng khi đổi cách tính để bỏ kết quả cũ trong cache
+RISK_VERSION = 2
+RISK_SOURCES = ("price", "mcap")
+TRADING_DAYS = 252
+ROLLING_WINDOW = 20
+RISK_COLUMNS = ["Annual_Return", "Volatility", "Vol_20D", "Max_Drawdown", "Beta"]
+
+_cache = {}  # "risk" -> (fingerprints, DataFrame)
+_lock = threading.Lock()
+
+
+def _runs(*keys):
+    """Start positions of the runs of equal consecutive `keys`."""
+    change = np.zeros(len(keys[0]), dtype=bool)
+    if len(change):
+        change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def _run_sums(values, starts):
+    """Sum of each run of `values` (NaN counts as 0)."""
+    return np.add.reduceat(np.nan_to_num(values, nan=0.0), starts) if len(starts) else np.empty(0)
+
+
+def previous_valid(values, ticker):
+    """Position of the last earlier non-missing value of the same ticker, -1 if none."""
+    n = len(values)
+    rows = np.arange(n)
+    previous = np.full(n, -1)
+    if n:
+        previous[1:] = np.maximum.accumulate(np.where(np.isnan(values), -1, rows))[:-1]
+        starts = _runs(ticker)
+        first = np.repeat(starts, np.diff(np.append(starts, n)))
+        previous[previous < first] = -1
+    return previous
+
+
+def daily_returns(price, ticker, previous=None):
+    """Simple return of every priced row against the last earlier price of the same ticker."""
+    if previous is None:
+        previous = previous_valid(price, ticker)
+    returns = np.full(len(price), np.nan)
+    paired = (previous >= 0) & ~np.isnan(price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[paired] = price[paired] / price[previous[paired]] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+
+def market_returns(returns, prev_cap, date_codes, n_dates):
+    """Cap-weighted market return of every date (weights: previous day's cap)."""
+    valid = ~np.isnan(returns) & (prev_cap > 0)
+    weighted = np.bincount(date_codes[valid], weights=(prev_cap * returns)[valid], minlength=n_dates)
+    caps = np.bincount(date_codes[valid], weights=prev_cap[valid], minlength=n_dates)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(caps > 0, weighted / caps, np.nan)
+
+
+def rolling_volatility(returns, ticker, window=ROLLING_WINDOW):
+    """Std of the last `window` returns of the same ticker (needs `window` values)."""
+    n = len(returns)
+    valid = ~np.isnan(returns)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, returns, 0.0))])
+    squares = np.concatenate([[0.0], np.cumsum(np.where(valid, returns * returns, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+
+    # Dòng đầu của mã chứa mỗi dòng: cửa sổ không được vượt qua nó
+    starts = _runs(ticker)
+    first = np.repeat(starts, np.diff(np.append(starts, n)))
+    end = np.arange(1, n + 1)
+    begin = end - window
+    ok = begin >= first
+    begin = np.maximum(begin, 0)
+    count = counts[end] - counts[begin]
+    s1, s2 = sums[end] - sums[begin], squares[end] - squares[begin]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (s2 - s1 * s1 / count) / (count - 1)
+    return np.where(ok & (count == window), np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def risk_metrics(panel):
+    """Per (Ticker, Year) risk metrics of a (Ticker, Date)-sorted daily panel."""
+    ticker = pd.factorize(panel["Ticker"])[0]
+    year = panel["Year"].to_numpy()
+    price = panel["Price"].to_numpy("float64")
+    cap = panel["MarketCap"].to_numpy("float64")
+
+    previous = previous_valid(price, ticker)
+    returns = daily_returns(price, ticker, previous)
+    # Trọng số: vốn hóa của ngày có giá làm gốc cho lợi suất
+    prev_cap = np.where(previous >= 0, cap[previous], np.nan)
+
+    date_codes, dates = pd.factorize(panel["Date"])
+    market = market_returns(returns, np.nan_to_num(prev_cap, nan=0.0), date_codes, len(dates))[date_codes]
+    vol_20d = rolling_volatility(returns, ticker)
+
+    starts = _runs(ticker, year)
+    ends = np.append(starts[1:], len(panel))
+
+    # Beta: chỉ các ngày có cả lợi suất cổ phiếu và lợi suất thị trường
+    paired = ~np.isnan(returns) & ~np.isnan(market)
+    r, m = np.where(paired, returns, np.nan), np.where(paired, market, np.nan)
+    n = _run_sums(paired.astype("float64"), starts)
+    sum_r, sum_m = _run_sums(r, starts), _run_sums(m, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (_run_sums(r * m, starts) - sum_r * sum_m / n) / (n - 1)
+        var_m = (_run_sums(m * m, starts) - sum_m * sum_m / n) / (n - 1)
+        beta = np.where((n > 2) & (var_m > 0), cov / var_m, np.nan)
+
+    # Lợi suất năm và độ biến động: mọi ngày có lợi suất
+    has_return = ~np.isnan(returns)
+    count = _run_sums(has_return.astype("float64"), starts)
+    total, squares = _run_sums(returns, starts), _run_sums(returns * returns, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (squares - total * total / count) / (count - 1)
+    annual_return = np.where(count > 0, np.expm1(_run_sums(np.log1p(returns), starts)), np.nan)
+    volatility = np.where(count > 1, np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS), np.nan)
+
+    # Sụt giảm tối đa so với đỉnh trước đó trong cùng năm
+    run_id = np.repeat(np.arange(len(starts)), ends - starts)
+    peak = pd.Series(price).groupby(run_id).cummax().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = price / peak - 1
+    max_drawdown = np.fmin.reduceat(drawdown, starts) if len(starts) else np.empty(0)
+
+    return pd.DataFrame({
+        "Ticker": panel["Ticker"].to_numpy()[starts].astype(str),
+        "Year": year[starts].astype("int16"),
+        "Annual_Return": annual_return.astype("float32"),
+        "Volatility": volatility.astype("float32"),
+        # Độ biến động 20 phiên tại phiên cuối năm
+        "Vol_20D": (vol_20d[ends - 1] * np.sqrt(TRADING_DAYS)).astype("float32") if len(starts) else np.empty(0, "float32"),
+        "Max_Drawdown": np.minimum(max_drawdown, 0.0).astype("float32"),
+        "Beta": beta.astype("float32"),
+    })
+
+
+@disk_cached("risk_table", sources=lambda: fingerprints(*RISK_SOURCES), version=RISK_VERSION)
+def risk_table():
+    """Risk metrics of every ticker-year of the daily panel."""
+    return risk_metrics(load_panel().frame)
+
+
+def load_risk():
+    """Process-wide risk table indexed by (Ticker, Year)."""
+    key = fingerprints(*RISK_SOURCES)
+    entry = _cache.get("risk")
+    if entry is not None and entry[0] == key:
+        record("risk", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get("risk")
+        if entry is None or entry[0] != key:
+            record("risk", hit=False)
+            entry = (key, risk_table().set_index(["Ticker", "Year"]).sort_index())
+            _cache["risk"] = entry
+    return entry[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+
+    risk = load_risk()
+    pd.set_option("display.width", 160)
+    print(f"{len(risk):,} ticker-years")
+    print(risk[RISK_COLUMNS].describe().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Table-driven, vectorized rule engine for the assessments shown on the pages.
+
+Rules are data: a tier table is an ordered list of ``(code, clauses)``
+rows where every clause is ``(column, op, value)`` and all clauses of a
+row must hold; the first matching row wins (np.select semantics) and the
+default applies otherwise. A flag is true when any of its clause lists
+holds. Rules are evaluated column-wise over a whole table, so labelling
+thousands of rows costs the same handful of array operations as labelling
+one; `annotate` runs them over the health table once at load time and the
+pages only look up the resulting codes and their labels.
+
+A missing column behaves like a missing value: every comparison is false.
+"""
+import numpy as np
+import pandas as pd
+
+SAFE_RATINGS = ["AAA", "AA", "A"]
+
+HEALTH_GROUP_LABELS = {0: "Yếu", 1: "Trung bình", 2: "Tốt"}
+
+# Tăng khi bảng luật đổi: các bảng đã gắn mã trong kho dùng chung được dựng lại
+RULES_VERSION = 1
+
+OPS = {
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s.notna() & (s != v),
+    "in": lambda s, v: s.isin(v),
+    "isna": lambda s, v: s.isna(),
+}
+
+# Nhận định đầu tư trên bảng tổng hợp (trang Tổng quan)
+ASSESSMENT_TIERS = (
+    [
+        ("Rất tốt - Nên theo dõi", [("Health_Score", ">=", 75), ("Credit_Rating_Z", "in", SAFE_RATINGS)]),
+        ("Tốt - Có tiềm năng", [("Health_Score", ">=", 65), ("Buy_Net_Flag", "==", 1)]),
+        ("Trung bình - Cần theo dõi", [("Health_Score", ">=", 60)]),
+    ],
+    "Cần thận trọng",
+)
+
+# Giải thích điểm sức khỏe: cột mã -> (bậc, mặc định)
+NARRATIVE_TIERS = {
+    "Liquidity_Code": (
+        [
+            ("good", [("Current Ratio", ">=", 1.5), ("Cash Ratio", ">=", 0.3)]),
+            ("fair", [("Current Ratio", ">=", 1.0)]),
+        ],
+        "weak",
+    ),
+    "Leverage_Code": (
+        [
+            ("low", [("Debt to Asset", "<", 0.4)]),
+            ("medium", [("Debt to Asset", "<", 0.6)]),
+        ],
+        "high",
+    ),
+    "Profitability_Code": (
+        [
+            ("good", [("ROA", ">", 5), ("ROE", ">", 10)]),
+            ("fair", [("ROA", ">", 0), ("ROE", ">", 0)]),
+        ],
+        "weak",
+    ),
+    "Growth_Code": (
+        [
+            ("good", [("Revenue Growth", ">", 0), ("Net Income Growth", ">", 0)]),
+            ("revenue", [("Revenue Growth", ">", 0)]),
+        ],
+        "weak",
+    ),
+}
+
+# Cột mã -> (tiêu đề, {mã: mẫu câu}); mẫu câu định dạng bằng giá trị của dòng
+NARRATIVE_TEXT = {
+    "Liquidity_Code": ("Thanh khoản", {
+        "good": "Doanh nghiệp có khả năng thanh khoản tốt với tỷ lệ thanh khoản hiện tại {Current Ratio:.2f} và tỷ lệ tiền mặt {Cash Ratio:.2f}.",
+        "fair": "Khả năng thanh khoản ở mức chấp nhận được (tỷ lệ thanh khoản: {Current Ratio:.2f}).",
+        "weak": "Cần lưu ý về khả năng thanh khoản (tỷ lệ thanh khoản: {Current Ratio:.2f}).",
+    }),
+    "Leverage_Code": ("Đòn bẩy tài chính", {
+        "low": "Cơ cấu vốn an toàn với tỷ lệ nợ/vốn {Debt to Asset:.2%} và tỷ lệ vốn chủ sở hữu {Equity Ratio:.2%}.",
+        "medium": "Đòn bẩy tài chính ở mức trung bình (tỷ lệ nợ/vốn: {Debt to Asset:.2%}).",
+        "high": "Cần thận trọng với đòn bẩy tài chính cao (tỷ lệ nợ/vốn: {Debt to Asset:.2%}).",
+    }),
+    "Profitability_Code": ("Sinh lời", {
+        "good": "Khả năng sinh lời tốt với ROA {ROA:.2f}% và ROE {ROE:.2f}%.",
+        "fair": "Khả năng sinh lời ở mức trung bình (ROA: {ROA:.2f}%, ROE: {ROE:.2f}%).",
+        "weak": "Cần theo dõi khả năng sinh lời (ROA: {ROA:.2f}%, ROE: {ROE:.2f}%).",
+    }),
+    "Growth_Code": ("Tăng trưởng", {
+        "good": "Doanh nghiệp đang tăng trưởng với tốc độ tăng doanh thu {Revenue Growth:.2f}% và tăng lợi nhuận {Net Income Growth:.2f}%.",
+        "revenue": "Doanh thu tăng trưởng {Revenue Growth:.2f}% nhưng lợi nhuận cần theo dõi.",
+        "weak": "Cần lưu ý về xu hướng tăng trưởng (tăng trưởng doanh thu: {Revenue Growth:.2f}%).",
+    }),
+}
+
+# Z-Score từng chỉ tiêu: (tên hiển thị, cột); mã trạng thái nằm ở cột "<cột>_status"
+Z_SCORE_COLUMNS = [
+    ("ROA", "ROA_z"),
+    ("ROE", "ROE_z"),
+    ("Current Ratio", "Current Ratio_z"),
+    ("Cash Ratio", "Cash Ratio_z"),
+    ("Interest Coverage", "Interest Coverage_z"),
+    ("Debt to Asset", "Debt to Asset_z"),
+    ("Equity Ratio", "Equity Ratio_z"),
+    ("Net Income Growth", "Net Income Growth_z"),
+    ("Asset Growth", "Asset Growth_z"),
+    ("Health Score", "Health_Z"),
+]
+Z_STATUS_LABELS = {
+    "good": ("Tốt", "#10b981"),
+    "fair": ("Trung bình", "#f59e0b"),
+    "weak": ("Cần cải thiện", "#ef4444"),
+}
+HEALTH_Z_VERDICT = {
+    "good": "Doanh nghiệp có sức khỏe tài chính tốt so với trung bình ngành.",
+    "fair": "Sức khỏe tài chính ở mức trung bình so với ngành.",
+    "weak": "Cần cải thiện sức khỏe tài chính so với trung bình ngành.",
+}
+
+# Cảnh báo rủi ro: (cột cờ, các nhóm điều kiện – chỉ cần một nhóm đúng, nội dung)
+WARNING_RULES = [
+    ("Warn_Leverage", [[("Debt to Asset", ">", 0.6)]], "Đòn bẩy tài chính cao (tỷ lệ nợ/vốn > 60%)"),
+    ("Warn_Profit_Decline", [[("Net Income Growth", "<", 0)]], "Lợi nhuận có xu hướng giảm"),
+    ("Warn_Liquidity", [[("Current Ratio", "<", 1.0)]], "Khả năng thanh khoản cần được theo dõi"),
+    ("Warn_Loss", [[("ROA", "<", 0)], [("ROE", "<", 0)]], "Doanh nghiệp đang thua lỗ"),
+]
+
+# Gợi ý đầu tư theo Z-Score tổng hợp và xếp hạng tín nhiệm
+SUGGESTION_TIERS = (
+    [
+        ("no_data", [("Health_Z", "isna", None)]),
+        ("long_term", [("Health_Z", ">", 1), ("Credit_Rating_Z", "in", SAFE_RATINGS)]),
+        ("watch", [("Health_Z", ">", 0)]),
+    ],
+    "caution",
+)
+SUGGESTION_TEXT = {
+    "no_data": "Không đủ dữ liệu để đánh giá sức khỏe tài chính doanh nghiệp",
+    "long_term": "Doanh nghiệp có sức khỏe tài chính tốt, phù hợp cho đầu tư dài hạn",
+    "watch": "Theo dõi các chỉ số tài chính và xu hướng dòng tiền",
+    "caution": "Cần thận trọng, nên theo dõi kỹ các chỉ số trước khi quyết định đầu tư",
+}
+
+
+def _column(df, col, default):
+    """Column `col` of `df`, or a constant Series when it is missing."""
+    if col in df.columns:
+        return df[col]
+    return pd.Series(default, index=df.index)
+
+
+def matches(df, clauses):
+    """Boolean Series: rows of `df` satisfying every (column, op, value) clause."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in clauses:
+        mask &= np.asarray(OPS[op](_column(df, col, np.nan), value), dtype=bool)
+    return pd.Series(mask, index=df.index)
+
+
+def tier(df, tiers, default):
+    """Code of the first matching tier for every row (`default` otherwise)."""
+    conditions = [matches(df, clauses) for _, clauses in tiers]
+    codes = [code for code, _ in tiers]
+    return pd.Series(np.select(conditions, codes, default=default), index=df.index)
+
+
+def flag(df, any_of):
+    """True where at least one of the clause lists holds."""
+    mask = pd.Series(False, index=df.index)
+    for clauses in any_of:
+        mask |= matches(df, clauses)
+    return mask
+
+
+def z_status(z):
+    """Status code of Z-scores: good (> 1), fair (> 0), weak; missing stays NaN."""
+    codes = np.select([z > 1, z > 0], ["good", "fair"], default="weak")
+    return pd.Series(codes, index=z.index).where(z.notna())
+
+
+def assessment(df):
+    """Investment assessment ("Nhận định") for every row of the master table."""
+    return tier(df, *ASSESSMENT_TIERS)
+
+
+def annotate(df):
+    """Return the health table with every rule code and flag as columns.
+
+    Adds the narrative codes, a ``<z column>_status`` per Z-score, one
+    boolean column per warning plus ``Warning_Count``, and
+    ``Suggestion_Code``.
+    """
+    derived = {}
+    for col, (tiers, default) in NARRATIVE_TIERS.items():
+        derived[col] = tier(df, tiers, default)
+    for _, col in Z_SCORE_COLUMNS:
+        derived[f"{col}_status"] = z_status(_column(df, col, np.nan))
+    for col, any_of, _ in WARNING_RULES:
+        derived[col] = flag(df, any_of)
+    derived["Warning_Count"] = sum(derived[col] for col, _, _ in WARNING_RULES).astype("int8")
+    derived["Suggestion_Code"] = tier(df, *SUGGESTION_TIERS)
+
+    derived = pd.DataFrame(derived, index=df.index)
+    for col in derived.select_dtypes(["object", "str"]).columns:
+        derived[col] = derived[col].astype("category")
+    return pd.concat([df.drop(columns=derived.columns, errors="ignore"), derived], axis=1)
+
+
+def health_group_labels(groups):
+    """Map Health_Group codes to labels; unknown codes become "Nhóm <x>"."""
+    labels = groups.map(HEALTH_GROUP_LABELS)
+    other = groups.notna() & labels.isna()
+    labels = labels.where(~other, "Nhóm " + groups.astype(str))
+    return labels.fillna("Không xác định")
@@ -0,0 +1,294 @@
+"""Vectorized health-score engine over the BCTC statement panel.
+
+Derives every financial ratio the pages display from the yearly
+statements, standardizes the scoring ratios into z-scores, averages them
+into the composite ``Health_Score_raw`` and scales that into ``Health_Z``,
+the 0–100 ``Health_Score`` and the ``Credit_Rating_Z`` bands. Each step is
+a handful of column operations over the whole panel, so scoring tens of
+thousands of ticker-years takes well under a second.
+
+With ``ratio_groups=None, score_groups=None`` the engine follows the
+convention of ``Data_health_score_dashboard`` (statistics over the whole
+table): fed that file's own ratio rows it reproduces its Health_Score,
+Health_Z and Credit_Rating_Z. Scores rebuilt from the BCTC workbooks still
+differ from the file, which covers fewer ticker-years and takes 2021
+growth from 2020 statements the workbooks do not include.
+
+`build_scores` writes the rebuilt table to the store. The data layer
+serves it as the "health" dataset only with ``DASHBOARD_DERIVED=1`` (see
+``core.data.DERIVED``); by default the pages keep the curated dashboard
+file. Columns the statements cannot reproduce are carried over from the
+dashboard file. By default it uses the per-year groupings: each ratio is
+compared against the same industry and year and the composite is scaled
+within each year, so every year is scored independently and only the
+years whose statements changed are rescored. The whole-table convention
+remains available and rescores every year.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from core.bctc import load_bctc
+from core.data import DATA_DIR, DATASETS, DERIVED, STORE_DIR, normalize
+
+SCORES_FILE = DERIVED["health"]
+
+# Cột BCTC dùng để tính chỉ số
+TICKER = "MÃ"
+YEAR = "NĂM"
+COMPANY = "TÊN CÔNG TY"
+INDUSTRY = "NGÀNH ICB - CẤP 2"
+CURRENT_ASSETS = "CĐKT. TÀI SẢN NGẮN HẠN"
+CASH = "CĐKT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN"
+TOTAL_ASSETS = "CĐKT. TỔNG CỘNG TÀI SẢN"
+LIABILITIES = "CĐKT. NỢ PHẢI TRẢ"
+CURRENT_LIABILITIES = "CĐKT. NỢ NGẮN HẠN"
+EQUITY = "CĐKT. VỐN CHỦ SỞ HỮU"
+NET_REVENUE = "KQKD. DOANH THU THUẦN"
+GROSS_PROFIT = "KQKD. LỢI NHUẬN GỘP VỀ BÁN HÀNG VÀ CUNG CẤP DỊCH VỤ"
+INTEREST_EXPENSE = "KQKD. TRONG ĐÓ: CHI PHÍ LÃI VAY"
+OPERATING_PROFIT = "KQKD. LỢI NHUẬN THUẦN TỪ HOẠT ĐỘNG KINH DOANH"
+NET_INCOME = "KQKD. LỢI NHUẬN SAU THUẾ THU NHẬP DOANH NGHIỆP"
+OPERATING_CASH_FLOW = "LCTT. LƯU CHUYỂN TIỀN TỆ RÒNG TỪ CÁC HOẠT ĐỘNG SẢN XUẤT KINH DOANH (TT)"
+CASH_BEGIN = "LCTT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN ĐẦU KỲ (TT)"
+CASH_END = "LCTT. TIỀN VÀ TƯƠNG ĐƯƠNG TIỀN CUỐI KỲ (TT)"
+
+BCTC_COLUMNS = [
+    TICKER, YEAR, COMPANY, INDUSTRY, CURRENT_ASSETS, CASH, TOTAL_ASSETS,
+    LIABILITIES, CURRENT_LIABILITIES, EQUITY, NET_REVENUE, GROSS_PROFIT,
+    INTEREST_EXPENSE, OPERATING_PROFIT, NET_INCOME, OPERATING_CASH_FLOW,
+    CASH_BEGIN, CASH_END,
+]
+
+# Chỉ số = tử số / mẫu số
+RATIOS = {
+    "Current Ratio": (CURRENT_ASSETS, CURRENT_LIABILITIES),
+    "Cash Ratio": (CASH, CURRENT_LIABILITIES),
+    "Debt to Asset": (LIABILITIES, TOTAL_ASSETS),
+    "Equity Ratio": (EQUITY, TOTAL_ASSETS),
+    "ROA": (NET_INCOME, TOTAL_ASSETS),
+    "ROE": (NET_INCOME, EQUITY),
+    "Net Profit Margin": (NET_INCOME, NET_REVENUE),
+    "Operating Profit Margin": (OPERATING_PROFIT, NET_REVENUE),
+    "Gross Profit Margin": (GROSS_PROFIT, NET_REVENUE),
+    "Total Asset Turnover": (NET_REVENUE, TOTAL_ASSETS),
+    "Cash Flow to Sales": (OPERATING_CASH_FLOW, NET_REVENUE),
+}
+
+# Tăng trưởng so với năm liền trước của cùng mã
+GROWTH = {
+    "Revenue Growth": NET_REVENUE,
+    "Net Income Growth": NET_INCOME,
+    "Asset Growth": TOTAL_ASSETS,
+}
+
+# Chỉ số đưa vào điểm sức khỏe; nợ càng cao điểm càng thấp
+SCORE_RATIOS = [
+    "ROA", "ROE", "Current Ratio", "Cash Ratio", "Interest Coverage",
+    "Debt to Asset", "Equity Ratio", "Net Income Growth", "Asset Growth",
+]
+INVERTED_RATIOS = ["Debt to Asset"]
+
+# Ngưỡng Health_Z -> hạng tín nhiệm (ngưỡng dưới, loại trừ)
+RATING_BANDS = [(1.5, "AAA"), (0.5, "AA"), (0.0, "A"), (-0.5, "BBB"), (-1.5, "BB")]
+LOWEST_RATING = "B"
+
+RATIO_GROUPS = ("Ngành", "Year")
+SCORE_GROUPS = ("Year",)
+
+# Cột của file dashboard không suy ra được từ BCTC; giữ nguyên theo (Ticker, Year)
+CARRIED_COLUMNS = [
+    "Health_Group", "Health_Group_score", "Health_Label", "AR Turnover", "EPS",
+    "Fixed Asset Ratio", "Equity to Fixed Asset Ratio",
+]
+
+
+def _divide(num, den):
+    """Element-wise num / den with zero or missing denominators as NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num / den
+    return out.where(np.isfinite(out))
+
+
+def compute_ratios(bctc):
+    """One row per (Ticker, Year) with every ratio derived from the statements."""
+    df = (
+        bctc.dropna(subset=[TICKER, YEAR])
+        .drop_duplicates([TICKER, YEAR], keep="last")
+        .sort_values([TICKER, YEAR], kind="stable")
+        .reset_index(drop=True)
+    )
+    col = {c: pd.to_numeric(df[c], errors="coerce") for c in BCTC_COLUMNS[4:] if c in df.columns}
+
+    out = pd.DataFrame({
+        "Ticker": df[TICKER].astype(str).to_numpy(),
+        "Tên công ty": df[COMPANY].to_numpy() if COMPANY in df.columns else None,
+        "Ngành": df[INDUSTRY].to_numpy() if INDUSTRY in df.columns else None,
+        "Year": df[YEAR].astype("int16").to_numpy(),
+    })
+    for name, (num, den) in RATIOS.items():
+        out[name] = _divide(col[num], col[den]).to_numpy()
+
+    # Chi phí lãi vay được ghi âm trong KQKD
+    interest = col[INTEREST_EXPENSE].abs()
+    out["Interest Coverage"] = _divide(col[OPERATING_PROFIT] + interest, interest).to_numpy()
+
+    # Năm liền trước của cùng mã nằm ngay phía trên sau khi sắp xếp
+    ticker = out["Ticker"].to_numpy()
+    year = out["Year"].to_numpy()
+    has_prev = np.zeros(len(out), dtype=bool)
+    has_prev[1:] = (ticker[1:] == ticker[:-1]) & (year[1:] == year[:-1] + 1)
+    for name, source in GROWTH.items():
+        values = col[source]
+        growth = _divide(values, values.shift(1)) - 1
+        out[name] = growth.where(has_prev).to_numpy()
+
+    out["Net Increase in Cash"] = (col[CASH_END] - col[CASH_BEGIN]).to_numpy()
+    out["ICB_Level_2"] = out["Ngành"]
+    return out
+
+
+def zscores(values, groups=None):
+    """Standardize every column of `values`, optionally within `groups`.
+
+    Uses the sample standard deviation. Rows in groups without spread
+    (one member, or all equal) get 0 instead of NaN; missing values stay
+    missing.
+    """
+    if groups is None:
+        mean, std = values.mean(), values.std()
+    else:
+        grouped = values.groupby(groups, observed=True, dropna=False)
+        mean, std = grouped.transform("mean"), grouped.transform("std")
+    z = (values - mean) / std.where(std > 0)
+    return z.where(values.isna() | z.notna(), 0.0)
+
+
+def rating_bands(health_z):
+    """Credit rating for each Health_Z value (first band above wins)."""
+    conditions = [health_z > bound for bound, _ in RATING_BANDS]
+    ratings = np.select(conditions, [label for _, label in RATING_BANDS], default=LOWEST_RATING)
+    return pd.Series(ratings, index=health_z.index).where(health_z.notna())
+
+
+def score(ratios, ratio_groups=RATIO_GROUPS, score_groups=SCORE_GROUPS):
+    """Add the _score/_z columns, Health_Score_raw/_Z/Score and Credit_Rating_Z.
+
+    `ratio_groups` are the columns each ratio is standardized within;
+    `score_groups` those the composite is scaled within. ``None`` means
+    the whole table.
+    """
+    df = ratios.copy()
+    values = df[SCORE_RATIOS].astype("float64")
+    values.columns = [f"{name}_score" for name in SCORE_RATIOS]
+
+    def keys(groups):
+        return None if groups is None else [df[c] for c in groups]
+
+    z = zscores(values, keys(ratio_groups))
+    for name in INVERTED_RATIOS:
+        z[f"{name}_score"] = -z[f"{name}_score"]
+    z.columns = [f"{name}_z" for name in SCORE_RATIOS]
+
+    raw = z.mean(axis=1)
+    if score_groups is None:
+        low, high = raw.min(), raw.max()
+    else:
+        grouped = raw.groupby(keys(score_groups), observed=True, dropna=False)
+        low, high = grouped.transform("min"), grouped.transform("max")
+    health_z = zscores(raw.to_frame(), keys(score_groups)).iloc[:, 0]
+
+    df = pd.concat([df, values, z], axis=1)
+    df["Health_Score_raw"] = raw
+    span = pd.Series(high - low, index=raw.index)
+    df["Health_Score"] = ((raw - low) / span.where(span > 0) * 100).fillna(50.0).where(raw.notna())
+    df["Health_Z"] = health_z
+    df["Credit_Rating_Z"] = rating_bands(health_z)
+    return df
+
+
+def input_hashes(bctc, salt=None):
+    """Hash of the statement values behind every (Ticker, Year) row.
+
+    `salt` (the groupings) is mixed into every hash, so rows scored with
+    other groupings count as changed.
+    """
+    df = bctc.dropna(subset=[TICKER, YEAR]).drop_duplicates([TICKER, YEAR], keep="last")
+    values = [c for c in BCTC_COLUMNS[2:] if c in df.columns]
+    hash_key = hashlib.sha1(repr(salt).encode()).hexdigest()[:16]
+    return pd.DataFrame({
+        "Ticker": df[TICKER].astype(str).to_numpy(),
+        "Year": df[YEAR].astype("int16").to_numpy(),
+        "BCTC_Hash": pd.util.hash_pandas_object(df[values], index=False, hash_key=hash_key).to_numpy(),
+    })
+
+
+def stale_years(current, stored):
+    """Years whose scores must be recomputed after the statements changed.
+
+    A (Ticker, Year) row that was added, removed or modified invalidates
+    its own year (cross-sectional statistics) and the next one (growth).
+    """
+    stored = stored.assign(Ticker=stored["Ticker"].astype(str), Year=stored["Year"].astype("int16"))
+    merged = current.merge(
+        stored, on=["Ticker", "Year"], how="outer", suffixes=("", "_stored"), indicator=True
+    )
+    changed = (merged["_merge"] != "both") | (merged["BCTC_Hash"] != merged["BCTC_Hash_stored"])
+    years = {int(y) for y in merged.loc[changed, "Year"].unique()}
+    present = {int(y) for y in current["Year"].unique()}
+    return years | {y + 1 for y in years if y + 1 in present}
+
+
+def carried_columns(source_dir=DATA_DIR, store_dir=STORE_DIR):
+    """`CARRIED_COLUMNS` of the dashboard file by (Ticker, Year), or None without it."""
+    from core.etl import find_source, read_source
+
+    path = store_dir / DATASETS["health"]
+    if not path.exists():
+        path = find_source("health", source_dir)
+    if path is None:
+        return None
+    df = normalize(read_source(path)).dropna(subset=["Ticker", "Year"])
+    df = df.drop_duplicates(["Ticker", "Year"], keep="last")
+    return pd.DataFrame({
+        "Ticker": df["Ticker"].astype(str).to_numpy(),
+        "Year": df["Year"].astype("int16").to_numpy(),
+        **{c: df[c].to_numpy() for c in CARRIED_COLUMNS if c in df.columns},
+    })
+
+
+def build_scores(source_dir=DATA_DIR, store_dir=STORE_DIR, ratio_groups=RATIO_GROUPS,
+                 score_groups=SCORE_GROUPS, full=False):
+    """Refresh the scores in the store; return the number of rows rescored or None.
+
+    Only the years returned by `stale_years` are rescored when every year is
+    scored independently (both groupings include Year); otherwise, or with
+    `full`, the whole panel is.
+    """
+    from core.etl import apply_schema, partition_years, write_partitions
+
+    bctc = load_bctc(BCTC_COLUMNS, source_dir=source_dir, store_dir=store_dir)
+    if bctc.empty:
+        return None
+
+    target = store_dir / SCORES_FILE
+    current = input_hashes(bctc, (ratio_groups, score_groups))
+    per_year = all(groups is not None and "Year" in groups for groups in (ratio_groups, score_groups))
+    if per_year and not full and target.is_dir():
+        stored = pd.read_parquet(target, columns=["Ticker", "Year", "BCTC_Hash"])
+        years = stale_years(current, stored)
+    else:
+        years = {int(y) for y in current["Year"].unique()} | partition_years(target)
+
+    # Tăng trưởng của năm y cần số liệu năm y - 1
+    rows = bctc[bctc[YEAR].isin([*years, *(y - 1 for y in years)])]
+    ratios = compute_ratios(rows)
+    ratios = ratios[ratios["Year"].isin(years)]
+    df = score(ratios, ratio_groups, score_groups).merge(current, on=["Ticker", "Year"], how="left")
+    carried = carried_columns(source_dir, store_dir)
+    if carried is not None:
+        df = df.merge(carried, on=["Ticker", "Year"], how="left")
+
+    write_partitions(apply_schema("health", df), target, years)
+    return len(df)
@@ -0,0 +1,212 @@
+"""Indexed stock screener over the health table.
+
+A query is a conjunction of predicates on any column of the (annotated)
+health table::
+
+    ROA > 0.05 and Debt to Asset < 0.4 and Revenue Growth > 0
+    Credit_Rating_Z in AAA, AA and Warn_Loss == 0 and Year >= 2023
+
+Clauses use the operators of ``core.rules`` (``>``, ``>=``, ``<``, ``<=``,
+``==``, ``!=``, ``in``), so a parsed query is a rules clause list. It is
+answered from indexes built once per health file version and per year:
+a numeric metric keeps its values sorted with their row positions, so a
+range predicate is two binary searches and a slice; a categorical or flag
+column keeps the row positions of every value. The position sets of all
+clauses are intersected as bitmaps over the year's rows, smallest first.
+"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.cachestats import record
+from core.data import fingerprint, load_dataset
+from core.rules import OPS
+
+QUERY_OPERATOR = re.compile(r"^\s*(?P<op>>=|<=|==|!=|>|<|=|in\b)\s*(?P<value>.+?)\s*$", re.I)
+QUERY_AND = re.compile(r"\s+and\s+", re.I)
+SCREEN_EXAMPLE = "ROA > 0.05 and Debt to Asset < 0.4 and Revenue Growth > 0"
+
+_cache = {}  # "health" -> (fingerprint, ScreenIndex)
+_lock = threading.Lock()
+
+
+def _is_categorical(s):
+    return isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s.dtype) \
+        or not pd.api.types.is_numeric_dtype(s.dtype)
+
+
+def parse_query(text, columns):
+    """Parse `text` into [(column, op, value)]; raise ValueError if it is invalid.
+
+    `columns` maps column name -> Series (or dtype holder) used to type
+    the value: numbers for numeric metrics, strings (comma separated for
+    ``in``) for categorical ones, 0/1/true/false for flags.
+    """
+    # Tên cột có thể chứa khoảng trắng và chữ "in" (Net Increase in Cash):
+    # khớp tên dài nhất trước rồi mới đọc toán tử
+    names = sorted(columns, key=len, reverse=True)
+    clauses = []
+    for part in QUERY_AND.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        column = next((name for name in names if part.startswith(name)), None)
+        if column is None:
+            raise ValueError(f"Không có chỉ tiêu trong điều kiện {part!r}")
+        match = QUERY_OPERATOR.match(part[len(column):])
+        if match is None:
+            raise ValueError(f"Không hiểu điều kiện: {part!r}")
+        op, raw = match.group("op").lower(), match.group("value")
+        op = "==" if op == "=" else op
+
+        s = columns[column]
+        values = [v.strip() for v in raw.split(",")] if op == "in" else [raw]
+        if pd.api.types.is_bool_dtype(s.dtype):
+            values = [v.lower() in ("1", "true", "có") for v in values]
+        elif not _is_categorical(s):
+            if op == "in":
+                raise ValueError(f"{column!r} là chỉ tiêu số, dùng >, >=, <, <=, ==, !=")
+            try:
+                values = [float(v) for v in values]
+            except ValueError:
+                raise ValueError(f"Giá trị {raw!r} của {column!r} không phải là số") from None
+        elif op not in ("==", "!=", "in"):
+            raise ValueError(f"{column!r} là chỉ tiêu phân loại, dùng ==, != hoặc in")
+        clauses.append((column, op, values if op == "in" else values[0]))
+    return clauses
+
+
+class YearIndex:
+    """Sorted and bitmap indexes over the rows of one year.
+
+    `frame` is the year's slice of the table and `start` its first row in
+    the whole table, so positions can be returned for either.
+    """
+
+    def __init__(self, frame, start=0):
+        self.frame = frame
+        self.start = start
+        self.sorted = {}  # cột số -> (giá trị đã sắp, vị trí dòng)
+        self.values = {}  # cột phân loại -> {giá trị: vị trí dòng}
+        for col in frame.columns:
+            s = frame[col]
+            if col == "Year":
+                continue
+            if _is_categorical(s):
+                self.values[col] = {
+                    key: np.asarray(pos, dtype=np.int32)
+                    for key, pos in s.groupby(s, observed=True, sort=False).indices.items()
+                }
+            else:
+                values = s.to_numpy()
+                valid = np.flatnonzero(~np.isnan(values.astype("float64", copy=False)))
+                order = valid[np.argsort(values[valid], kind="stable")]
+                self.sorted[col] = (values[order], order.astype(np.int32))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def positions(self, column, op, value):
+        """Row positions matching one clause (NaN never matches)."""
+        if column in self.sorted:
+            values, order = self.sorted[column]
+            if values.dtype.kind == "f":
+                # So sánh ở độ chính xác của cột, như pandas làm với float32
+                value = values.dtype.type(value)
+            lo = np.searchsorted(values, value, "left")
+            hi = np.searchsorted(values, value, "right")
+            if op == ">":
+                return order[hi:]
+            if op == ">=":
+                return order[lo:]
+            if op == "<":
+                return order[:lo]
+            if op == "<=":
+                return order[:hi]
+            if op == "==":
+                return order[lo:hi]
+            return np.concatenate([order[:lo], order[hi:]])  # !=
+
+        index = self.values[column]
+        empty = np.empty(0, dtype=np.int32)
+        if op == "==":
+            return index.get(value, empty)
+        wanted = value if op == "in" else [k for k in index if k != value]
+        parts = [index[k] for k in wanted if k in index]
+        return np.concatenate(parts) if parts else empty
+
+    def select(self, clauses):
+        """Row positions matching every clause, in row order."""
+        if not clauses:
+            return np.arange(len(self), dtype=np.int32)
+        sets = sorted((self.positions(*clause) for clause in clauses), key=len)
+        if len(sets[0]) == 0:
+            return sets[0]
+
+        bitmap = np.zeros(len(self), dtype=bool)
+        bitmap[sets[0]] = True
+        for positions in sets[1:]:
+            other = np.zeros(len(self), dtype=bool)
+            other[positions] = True
+            bitmap &= other
+        return np.flatnonzero(bitmap)
+
+
+class ScreenIndex:
+    """Per-year indexes over the whole health table."""
+
+    def __init__(self, df):
+        # Sắp theo năm: mỗi năm là một đoạn liên tiếp, kết quả lấy bằng một lần take
+        self.frame = df.sort_values("Year", kind="stable").reset_index(drop=True)
+        self.columns = {col: self.frame[col] for col in self.frame.columns}
+        bounds = np.flatnonzero(np.diff(self.frame["Year"].to_numpy())) + 1
+        starts = np.concatenate([[0], bounds]).astype(int)
+        ends = np.concatenate([bounds, [len(self.frame)]]).astype(int)
+        self.years = {
+            int(self.frame["Year"].iat[start]): YearIndex(self.frame.iloc[start:end].reset_index(drop=True), start)
+            for start, end in zip(starts, ends) if end > start
+        }
+
+    @property
+    def metrics(self):
+        """Numeric columns a query can compare against a number."""
+        return [col for col, s in self.columns.items() if not _is_categorical(s) and col != "Year"]
+
+    def parse(self, text):
+        """Clauses of query `text` against this table's columns."""
+        return parse_query(text, self.columns)
+
+    def query(self, text, years=None):
+        """Rows matching `text`, restricted to `years` if given, in Year order."""
+        clauses = self.parse(text)
+        year_clauses = [c for c in clauses if c[0] == "Year"]
+        clauses = [c for c in clauses if c[0] != "Year"]
+
+        # Year chọn phân vùng, không cần chỉ mục
+        selected = pd.Series([y for y in self.years if years is None or y in years], dtype="int64")
+        for _, op, value in year_clauses:
+            selected = selected[OPS[op](selected, value)]
+
+        positions = [self.years[year].select(clauses) + self.years[year].start for year in selected.tolist()]
+        if not positions:
+            return self.frame.iloc[:0]
+        return self.frame.take(np.concatenate(positions)).reset_index(drop=True)
+
+
+def load_screen_index():
+    """Process-wide ScreenIndex over the health table, rebuilt when it changes."""
+    key = fingerprint("health")
+    entry = _cache.get("health")
+    if entry is not None and entry[0] == key:
+        record("screener", hit=True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get("health")
+        if entry is None or entry[0] != key:
+            record("screener", hit=False)
+            entry = (key, ScreenIndex(load_dataset("health")))
+            _cache["health"] = entry
+    return entry[1]
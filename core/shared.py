@@ -0,0 +1,111 @@
+"""Memory-mapped Arrow files shared by every dashboard worker process.
+
+The processed tables (datasets, the wide daily panel, BCTC) are written
+once as uncompressed Arrow IPC (Feather v2) files under
+``store/shared/`` and memory-mapped read-only by every process. Their
+pages live in the OS page cache, so N workers behind a load balancer hold
+one copy of the data instead of N, and a fresh worker maps the existing
+files instead of re-reading and re-processing the sources.
+
+Each file carries the fingerprint of the sources it was built from (and
+the ``core.memory`` dtype rules it was compacted with); a worker that finds a stale or missing file builds the table itself and
+replaces the file atomically (processes still mapping the old file keep
+their view until they reload). To keep the mapping zero-copy, tables are
+written as a single record batch and float NaN is stored as a value,
+not as an Arrow null, so pandas can use the buffers as they are.
+
+``DASHBOARD_SHARED=0`` turns sharing off (every process keeps a private
+copy); ``DASHBOARD_SHARED_DIR`` moves the files.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from core.data import STORE_DIR
+from core.memory import DTYPES_VERSION
+
+ENABLED = os.environ.get("DASHBOARD_SHARED", "1") != "0"
+SHARED_DIR = Path(os.environ.get("DASHBOARD_SHARED_DIR") or STORE_DIR / "shared")
+METADATA_KEY = b"source_fingerprint"
+
+
+def table_path(name):
+    """Path of shared table `name`."""
+    return SHARED_DIR / f"{name}.arrow"
+
+
+def _key(fingerprint):
+    return json.dumps([DTYPES_VERSION, fingerprint], default=str).encode()
+
+
+def to_arrow(df):
+    """Arrow table of `df` whose numeric columns pandas can map without copying.
+
+    Numeric and datetime columns are converted straight from their numpy
+    buffers, so NaN stays a float value instead of becoming a null.
+    """
+    arrays = []
+    for col in df.columns:
+        s = df[col]
+        if (
+            isinstance(s.dtype, (pd.CategoricalDtype, pd.StringDtype))
+            or pd.api.types.is_bool_dtype(s.dtype)
+            or not (pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_datetime64_dtype(s.dtype))
+        ):
+            arrays.append(pa.array(s))
+        else:
+            arrays.append(pa.array(s.to_numpy(), from_pandas=False))
+    return pa.table(arrays, names=[str(col) for col in df.columns])
+
+
+def write_table(df, name, fingerprint):
+    """Write `df` as shared table `name`, replacing the file atomically."""
+    table = to_arrow(df).replace_schema_metadata({METADATA_KEY: _key(fingerprint)})
+    path = table_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Tên file tạm riêng cho từng tiến trình/luồng: nhiều worker có thể ghi cùng lúc
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    feather.write_feather(table, tmp, compression="uncompressed", chunksize=max(len(df), 1))
+    os.replace(tmp, path)
+
+
+def read_table(name, fingerprint):
+    """Memory-map shared table `name`; None if it is missing or stale."""
+    path = table_path(name)
+    try:
+        source = pa.memory_map(str(path), "r")
+        reader = pa.ipc.open_file(source)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if (reader.schema.metadata or {}).get(METADATA_KEY) != _key(fingerprint):
+        return None
+    return reader.read_all().to_pandas(split_blocks=True)
+
+
+def shared_table(name, fingerprint, build):
+    """Table `name` for `fingerprint`: mapped from disk, or built and shared.
+
+    `build()` runs only when no up-to-date file exists. Its result is
+    written, then mapped back so this process uses the shared pages too.
+    When the file cannot be written the built frame is returned as is.
+    """
+    if not ENABLED:
+        return build()
+
+    df = read_table(name, fingerprint)
+    if df is not None:
+        return df
+
+    df = build()
+    try:
+        write_table(df, name, fingerprint)
+    except OSError:
+        return df
+    mapped = read_table(name, fingerprint)
+    return df if mapped is None else mapped
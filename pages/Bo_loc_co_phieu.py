@@ -0,0 +1,97 @@
+# ============================================================
+# TRANG 3 – BỘ LỌC CỔ PHIẾU THEO CHỈ TIÊU
+# ============================================================
+
+# =======================
+# LỚP 0 – CẤU HÌNH + CSS
+# =======================
+import time
+
+import streamlit as st
+
+st.set_page_config(
+    page_title="Bộ lọc cổ phiếu",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Đo thời gian / bộ nhớ từng phần khi bật DASHBOARD_PROFILE=1 hoặc mở trang với ?profile=1
+from core import profiling
+
+prof = profiling.start("Bo_loc_co_phieu", st.query_params.get("profile") == "1")
+prof.mark("LỚP 0 – CẤU HÌNH + CSS")
+
+from core.company import PAGE_CSS
+
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+# =======================
+# LỚP 1 – TẢI DỮ LIỆU + CHỈ MỤC
+# =======================
+prof.mark("LỚP 1 – TẢI DỮ LIỆU + CHỈ MỤC")
+from core.screener import SCREEN_EXAMPLE, load_screen_index
+
+# Chỉ mục sắp xếp / bitmap theo (Năm, chỉ tiêu), dựng một lần cho mỗi phiên bản file
+index = load_screen_index()
+prof.rows(len(index.frame))
+
+DEFAULT_COLUMNS = ["Ticker", "Tên công ty", "Ngành", "Year", "Health_Score", "Credit_Rating_Z"]
+
+# =======================
+# LỚP 2 – TIÊU ĐỀ + ĐIỀU KIỆN LỌC
+# =======================
+prof.mark("LỚP 2 – TIÊU ĐỀ + ĐIỀU KIỆN LỌC")
+st.markdown("<h1 style='text-align: center; background-color: #ffffff; color: #0f172a; font-size: 48px; font-weight: 800; margin-bottom: 20px; margin-top: 10px; padding: 20px; border-radius: 8px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>BỘ LỌC CỔ PHIẾU</h1>", unsafe_allow_html=True)
+
+st.sidebar.header("Phạm vi lọc")
+year_options = sorted(index.years)
+years = st.sidebar.multiselect("Năm", year_options, default=year_options[-1:])
+
+sort_options = [col for col in index.frame.columns if col not in ("Tên công ty",)]
+sort_by = st.sidebar.selectbox("Sắp xếp theo", sort_options, index=sort_options.index("Health_Score"))
+descending = st.sidebar.checkbox("Giảm dần", value=True)
+
+query = st.text_input(
+    "Điều kiện lọc (nối bằng and; toán tử >, >=, <, <=, ==, !=, in)",
+    value=SCREEN_EXAMPLE,
+)
+with st.expander("Các chỉ tiêu có thể dùng"):
+    st.markdown(
+        "**Chỉ tiêu số:** " + ", ".join(index.metrics)
+        + "\n\n**Chỉ tiêu phân loại** (dùng ==, != hoặc in A, B): "
+        + ", ".join(col for col in index.columns if col not in index.metrics and col != "Year")
+    )
+
+# =======================
+# LỚP 3 – KẾT QUẢ
+# =======================
+prof.mark("LỚP 3 – KẾT QUẢ")
+start = time.perf_counter()
+try:
+    result = index.query(query, years or None)
+except ValueError as exc:
+    st.error(str(exc))
+    profiling.finish(prof)
+    st.stop()
+elapsed_ms = (time.perf_counter() - start) * 1000
+result = result.sort_values(sort_by, ascending=not descending, kind="stable", na_position="last")
+prof.rows(len(result))
+
+st.markdown("<div class='section'>Kết quả lọc</div>", unsafe_allow_html=True)
+st.caption(f"{len(result):,} doanh nghiệp – năm thỏa điều kiện ({elapsed_ms:.1f} ms)")
+
+extra_columns = [col for col, _, _ in index.parse(query) if col not in DEFAULT_COLUMNS]
+st.dataframe(
+    result[DEFAULT_COLUMNS + list(dict.fromkeys(extra_columns))],
+    use_container_width=True,
+    hide_index=True
+)
+
+st.download_button(
+    "Tải kết quả (CSV)",
+    result.to_csv(index=False).encode("utf-8-sig"),
+    file_name="bo_loc_co_phieu.csv",
+    mime="text/csv",
+)
+
+profiling.finish(prof)
@@ -0,0 +1,63 @@
+"""core.bctc: per-workbook failures are skipped and retried on the next load."""
+import pandas as pd
+import pytest
+
+from core import bctc, shared
+
+pytestmark = pytest.mark.filterwarnings("ignore:skipping unreadable BCTC workbook")
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "SHARED_DIR", tmp_path / "store" / "shared")
+    monkeypatch.setattr(bctc, "_cache", {})
+
+
+def write_workbook(directory, year, rows=3):
+    pd.DataFrame({
+        "Mã ": [f"T{i}" for i in range(rows)],
+        "CĐKT. TỔNG CỘNG TÀI SẢN": [float(year + i) for i in range(rows)],
+    }).to_excel(directory / f"{year}_BCTC.xlsx", index=False)
+
+
+def test_unreadable_workbook_is_skipped(tmp_path):
+    write_workbook(tmp_path, 2021)
+    (tmp_path / "2022_BCTC.xlsx").write_bytes(b"not a workbook")
+    with pytest.warns(UserWarning, match="2022_BCTC.xlsx"):
+        df = bctc.read_bctc(bctc.bctc_sources(tmp_path))
+    assert list(df["NĂM"].unique()) == [2021]
+    assert list(df.columns) == ["MÃ", "CĐKT. TỔNG CỘNG TÀI SẢN", "NĂM"]
+
+
+def test_failed_year_is_not_fingerprinted(tmp_path):
+    store = tmp_path / "store"
+    write_workbook(tmp_path, 2021)
+    (tmp_path / "2022_BCTC.xlsx").write_bytes(b"not a workbook")
+    assert bctc.build_bctc(tmp_path, store) == 3
+    assert [entry[0] for entry in bctc.cached_fingerprint(store / bctc.BCTC_FILE)] == [2021]
+
+
+def test_failed_year_is_retried_on_next_load(tmp_path, monkeypatch):
+    store = tmp_path / "store"
+    write_workbook(tmp_path, 2021)
+    write_workbook(tmp_path, 2022)
+    read_excel = pd.read_excel
+
+    def flaky(path, *args, **kwargs):
+        if path.name.startswith("2022"):
+            raise OSError("locked")
+        return read_excel(path, *args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_excel", flaky)
+    assert list(bctc.load_bctc(source_dir=tmp_path, store_dir=store)["NĂM"].unique()) == [2021]
+
+    # Workbook không đổi nhưng đọc lại được ở tiến trình sau
+    monkeypatch.setattr(pd, "read_excel", read_excel)
+    monkeypatch.setattr(bctc, "_cache", {})
+    assert list(bctc.load_bctc(source_dir=tmp_path, store_dir=store)["NĂM"].unique()) == [2021, 2022]
+
+
+def test_no_readable_workbook(tmp_path):
+    (tmp_path / "2021_BCTC.xlsx").write_bytes(b"not a workbook")
+    assert bctc.build_bctc(tmp_path, tmp_path / "store") is None
+    assert bctc.load_bctc(source_dir=tmp_path, store_dir=tmp_path / "store").empty
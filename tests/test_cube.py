@@ -0,0 +1,126 @@
+"""core.cube: merged cube cells against the same statistics over the filtered rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.cube import SAFE_RATINGS, FilterCube
+from core.master import filter_rows
+
+RATINGS = ["AAA", "AA", "A", "BBB", "BB", "B"]
+INDUSTRIES = ["Bất động sản", "Ngân hàng", "Thực phẩm", "Xây dựng", "Dầu khí"]
+YEARS = [2021, 2022, 2023, 2024]
+
+
+def master_table(seed=0, tickers=300):
+    """One row per (Ticker, Year) with the columns the cube aggregates, NaN included."""
+    rng = np.random.default_rng(seed)
+    n = tickers * len(YEARS)
+
+    def with_nan(values, share=0.1):
+        values = values.astype("float64")
+        values[rng.random(n) < share] = np.nan
+        return values
+
+    price = with_nan(rng.uniform(1, 100, n))
+    return pd.DataFrame({
+        "Ticker": np.repeat([f"T{i:03d}" for i in range(tickers)], len(YEARS)),
+        "Year": np.tile(YEARS, tickers).astype("int16"),
+        "Ngành": pd.Categorical(rng.choice([*INDUSTRIES, None], n)),
+        "Credit_Rating_Z": pd.Categorical(rng.choice([*RATINGS, None], n), categories=RATINGS),
+        "Buy_Net_Flag": with_nan(rng.integers(0, 2, n), share=0.05),
+        "Health_Score": with_nan(rng.uniform(0, 100, n)),
+        "Avg_MarketCap": with_nan(rng.uniform(1e9, 1e12, n)),
+        "Avg_Price": price,
+        "Max_Price": price * rng.uniform(1, 1.5, n),
+        "Min_Price": price * rng.uniform(0.5, 1, n),
+    })
+
+
+def kpis(rows):
+    """Brute-force FilterCube.kpis over the filtered rows."""
+    return {
+        "num_companies": rows["Ticker"].nunique(),
+        "avg_health": rows["Health_Score"].mean(),
+        "safe_pct": rows["Credit_Rating_Z"].isin(SAFE_RATINGS).mean() * 100,
+        "buy_pct": rows["Buy_Net_Flag"].mean() * 100,
+        "total_mcap": rows["Avg_MarketCap"].sum(),
+        "avg_price": rows["Avg_Price"].mean(),
+        "max_price": rows["Max_Price"].max(),
+        "min_price": rows["Min_Price"].min(),
+    }
+
+
+def selections(rng, count):
+    yield 2024, [], [], [1, 0]
+    yield 2021, INDUSTRIES, RATINGS, [1]
+    yield 2023, ["Không có ngành"], [], [1, 0]
+    for _ in range(count):
+        industries = list(rng.choice(INDUSTRIES, rng.integers(0, len(INDUSTRIES) + 1), replace=False))
+        ratings = list(rng.choice(RATINGS, rng.integers(0, len(RATINGS) + 1), replace=False))
+        flags = [[1, 0], [1], [0]][rng.integers(3)]
+        yield int(rng.choice(YEARS)), industries, ratings, flags
+
+
+@pytest.fixture(scope="module")
+def table():
+    return master_table()
+
+
+@pytest.fixture(scope="module")
+def cube(table):
+    return FilterCube(table)
+
+
+def test_kpis_match_filtered_rows(table, cube):
+    rng = np.random.default_rng(1)
+    for year, industries, ratings, flags in selections(rng, 200):
+        rows = filter_rows(table[table["Year"] == year], industries, ratings, flags)
+        actual = FilterCube.kpis(cube.select(year, industries, ratings, flags))
+        expected = kpis(rows)
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            assert actual[key] == pytest.approx(value, rel=1e-9, nan_ok=True), (key, year, industries, ratings, flags)
+
+
+def test_chart_aggregates_match_filtered_rows(table, cube):
+    rng = np.random.default_rng(2)
+    for year, industries, ratings, flags in selections(rng, 50):
+        rows = filter_rows(table[table["Year"] == year], industries, ratings, flags)
+        cells = cube.select(year, industries, ratings, flags)
+
+        counts = FilterCube.rating_counts(cells)
+        expected = rows["Credit_Rating_Z"].value_counts().loc[lambda s: s > 0]
+        assert dict(zip(counts["Credit_Rating_Z"], counts["rows"])) == expected.to_dict()
+        assert counts["rows"].is_monotonic_decreasing
+
+        health = FilterCube.industry_health(cells).set_index("Ngành")["Health_Score"]
+        expected = rows.groupby("Ngành", observed=True)["Health_Score"].mean()
+        pd.testing.assert_series_equal(
+            health.sort_index(), expected.sort_index(), check_names=False, check_index_type=False,
+            check_categorical=False,
+        )
+
+        heatmap = FilterCube.heatmap(cells).set_index(["Ngành", "Credit_Rating_Z"])["Count"]
+        expected = rows.groupby(["Ngành", "Credit_Rating_Z"], observed=True).size().loc[lambda s: s > 0]
+        assert heatmap.to_dict() == expected.to_dict()
+
+
+def test_industry_health_only_selected_industries(cube):
+    health = FilterCube.industry_health(cube.select(2022, INDUSTRIES[:2], [], [1, 0]))
+    assert sorted(health["Ngành"]) == sorted(INDUSTRIES[:2])
+
+
+def test_ticker_in_two_cells_of_a_year_is_rejected(table):
+    row = table[table["Year"] == 2022].iloc[[0]].copy()
+    other = [r for r in RATINGS if r != row["Credit_Rating_Z"].iloc[0]][0]
+    row["Credit_Rating_Z"] = pd.Categorical([other], categories=RATINGS)
+    with pytest.raises(ValueError):
+        FilterCube(pd.concat([table, row], ignore_index=True))
+
+
+def test_select_without_flag_filter(table, cube):
+    # flags=None: không lọc theo cờ, kể cả dòng thiếu Buy_Net_Flag
+    rows = table[table["Year"] == 2022]
+    cells = cube.select(2022, [], [], None)
+    assert cells["rows"].sum() == len(rows)
+    assert FilterCube.kpis(cells)["num_companies"] == rows["Ticker"].nunique()
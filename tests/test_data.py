@@ -0,0 +1,62 @@
+"""core.data: which copy of a dataset is served, and when it is re-read."""
+import os
+
+import pandas as pd
+import pytest
+
+from core import data, etl
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(data, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(data, "USE_DERIVED", False)
+    return tmp_path
+
+
+def write(path, rows, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"Mã": ["AAA"] * rows, "Năm": [2024] * rows}).to_parquet(path)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_store_copy_wins_over_older_root_file(root):
+    write(root / data.DATASETS["health"], 1, 10**18)
+    assert data.dataset_path("health") == root / data.DATASETS["health"]
+    write(root / "store" / data.DATASETS["health"], 2, 2 * 10**18)
+    assert data.dataset_path("health") == root / "store" / data.DATASETS["health"]
+
+
+def test_root_file_modified_after_etl_wins(root):
+    write(root / "store" / data.DATASETS["health"], 2, 10**18)
+    write(root / data.DATASETS["health"], 1, 2 * 10**18)
+    assert data.dataset_path("health") == root / data.DATASETS["health"]
+    assert data.fingerprint("health")[0] == str(root / data.DATASETS["health"])
+
+
+def test_derived_table_is_opt_in(root):
+    write(root / "store" / data.DATASETS["health"], 2, 10**18)
+    write(root / "store" / data.DERIVED["health"], 3, 10**18)
+    assert data.dataset_path("health") == root / "store" / data.DATASETS["health"]
+    assert data.dataset_path("health", derived=True) == root / "store" / data.DERIVED["health"]
+
+
+def test_unchanged_partitions_still_mark_the_compile(root):
+    source = root / data.DATASETS["price"]
+    pd.DataFrame({
+        "Mã": ["AAA", "AAA"], "Ngày": pd.to_datetime(["2023-06-01", "2024-06-03"]), "Giá": [1.0, 2.0],
+    }).to_parquet(source)
+    etl.build_dataset("price", root, root / "store")
+    compiled = data.dataset_path("price")
+    assert compiled == root / "store" / data.DATASETS["price"]
+
+    # Nội dung không đổi: partition giữ nguyên nhưng store vẫn mới hơn file gốc
+    partition = compiled / "Year=2024" / etl.PARTITION_FILE
+    before = partition.stat().st_mtime_ns
+    os.utime(compiled, ns=(10**18, 10**18))
+    os.utime(source, ns=(15 * 10**17, 15 * 10**17))
+    assert data.dataset_path("price") == source
+    etl.build_dataset("price", root, root / "store")
+    assert partition.stat().st_mtime_ns == before
+    assert data.dataset_path("price") == compiled
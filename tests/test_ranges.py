@@ -0,0 +1,151 @@
+"""core.ranges against brute-force numpy/pandas over the same rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.index import TickerIndex
+from core.ranges import BLOCK, TRADING_DAYS, PrefixSums, RangeStats, SparseTable
+
+
+def with_gaps(rng, n, missing=0.2):
+    values = rng.uniform(5, 50, n)
+    values[rng.random(n) < missing] = np.nan
+    return values
+
+
+def daily_panel(prices, seed=0):
+    """(Ticker, Date) frame with the given Price series and random MarketCap/Volume."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for ticker, price in prices.items():
+        n = len(price)
+        frames.append(pd.DataFrame({
+            "Ticker": ticker,
+            "Date": pd.bdate_range("2021-01-04", periods=n),
+            "Price": np.asarray(price, dtype="float64"),
+            "MarketCap": with_gaps(rng, n) * 1e9,
+            "Volume": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 10**6, n).astype("float64")),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def reference(rows):
+    """Brute-force RangeStats.summary over the rows of one range."""
+    price = rows["Price"].dropna()
+    traded = rows.dropna(subset=["Price", "Volume"])
+    volume = traded["Volume"].sum()
+    log_returns = np.log(price).diff().dropna()
+    return {
+        "Rows": len(rows),
+        "Avg_Price": price.mean(),
+        "Max_Price": price.max(),
+        "Min_Price": price.min(),
+        "Avg_MarketCap": rows["MarketCap"].mean(),
+        "VWAP": (traded["Price"] * traded["Volume"]).sum() / volume if volume > 0 else np.nan,
+        "Return": price.iloc[-1] / price.iloc[0] - 1 if len(price) else np.nan,
+        "Volatility": log_returns.std() * np.sqrt(TRADING_DAYS) if len(log_returns) > 1 else np.nan,
+    }
+
+
+def assert_summary(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value, rel=1e-6, abs=1e-9, nan_ok=True), key
+
+
+def test_prefix_sums_every_range():
+    rng = np.random.default_rng(1)
+    values = with_gaps(rng, 90)
+    sums = PrefixSums(values)
+    for lo in range(len(values) + 1):
+        for hi in range(lo, len(values) + 1):
+            part = values[lo:hi]
+            assert sums.count(lo, hi) == np.count_nonzero(~np.isnan(part))
+            assert sums.sum(lo, hi) == pytest.approx(np.nansum(part))
+            expected = np.nanmean(part) if sums.count(lo, hi) else np.nan
+            assert sums.mean(lo, hi) == pytest.approx(expected, nan_ok=True)
+
+
+def test_prefix_sums_without_missing_values():
+    sums = PrefixSums(np.arange(10.0))
+    assert sums.counts is None
+    assert sums.count(2, 7) == 5
+    assert sums.mean(2, 7) == 4.0
+    assert np.isnan(sums.mean(3, 3))
+
+
+@pytest.mark.parametrize("func, reduce", [(np.fmin, np.nanmin), (np.fmax, np.nanmax)])
+def test_sparse_table_block_edges(func, reduce):
+    rng = np.random.default_rng(2)
+    values = with_gaps(rng, 5 * BLOCK + 7, missing=0.1)
+    values[2 * BLOCK:3 * BLOCK] = np.nan  # a whole block without values
+    table = SparseTable(values, func)
+
+    edges = sorted({0, len(values)} | {b * BLOCK + d for b in range(6) for d in (-1, 0, 1)})
+    edges = [e for e in edges if 0 <= e <= len(values)]
+    for lo in edges:
+        for hi in edges:
+            part = values[lo:hi]
+            expected = reduce(part) if hi > lo and not np.isnan(part).all() else np.nan
+            assert table.query(lo, hi) == pytest.approx(expected, nan_ok=True), (lo, hi)
+
+
+@pytest.mark.parametrize("func, reduce", [(np.fmin, np.nanmin), (np.fmax, np.nanmax)])
+def test_sparse_table_every_range_small_blocks(func, reduce):
+    rng = np.random.default_rng(3)
+    values = with_gaps(rng, 70, missing=0.3)
+    table = SparseTable(values, func, block=4)
+    for lo in range(len(values) + 1):
+        for hi in range(lo, len(values) + 1):
+            part = values[lo:hi]
+            expected = reduce(part) if hi > lo and not np.isnan(part).all() else np.nan
+            assert table.query(lo, hi) == pytest.approx(expected, nan_ok=True), (lo, hi)
+
+
+def test_sparse_table_empty():
+    table = SparseTable(np.array([], dtype="float64"))
+    assert np.isnan(table.query(0, 0))
+
+
+def test_summary_return_skips_missing_prices():
+    stats = RangeStats(TickerIndex(daily_panel({"AAA": [10, np.nan, 20, 20, np.nan]})))
+    summary = stats.summary("AAA")
+    assert summary["Return"] == pytest.approx(1.0)
+    # Hai lợi suất: log(20/10) và 0
+    assert summary["Volatility"] == pytest.approx(np.std([np.log(2), 0.0], ddof=1) * np.sqrt(TRADING_DAYS))
+
+
+def test_summary_range_starting_on_missing_price():
+    frame = daily_panel({"AAA": [10, 12, np.nan, 15, 30], "BBB": [np.nan, 7, 14]})
+    stats = RangeStats(TickerIndex(frame))
+    dates = frame["Date"].drop_duplicates().sort_values().to_numpy()
+
+    # Ngày đầu khoảng thiếu giá: lợi suất tính từ 15, không từ 12 ngoài khoảng
+    assert stats.summary("AAA", dates[2], dates[4])["Return"] == pytest.approx(1.0)
+    assert stats.summary("AAA", dates[2], dates[3])["Return"] == 0.0
+    assert np.isnan(stats.summary("AAA", dates[2], dates[2])["Return"])
+    # Mã sau không nối lợi suất với giá cuối của mã trước
+    assert stats.summary("BBB")["Return"] == pytest.approx(1.0)
+    assert np.isnan(stats.summary("BBB")["Volatility"])
+
+
+def test_summary_matches_pandas():
+    rng = np.random.default_rng(4)
+    prices = {f"T{i:02d}": with_gaps(rng, int(rng.integers(1, 3 * BLOCK))) for i in range(12)}
+    frame = daily_panel(prices, seed=5)
+    stats = RangeStats(TickerIndex(frame))
+
+    for ticker, rows in frame.groupby("Ticker"):
+        dates = rows["Date"].to_numpy()
+        assert_summary(stats.summary(ticker), reference(rows))
+        for _ in range(40):
+            start, end = np.sort(rng.choice(dates, 2))
+            in_range = rows[(rows["Date"] >= start) & (rows["Date"] <= end)]
+            assert_summary(stats.summary(ticker, start, end), reference(in_range))
+
+
+def test_summary_unknown_ticker_is_empty():
+    stats = RangeStats(TickerIndex(daily_panel({"AAA": [1.0, 2.0]})))
+    summary = stats.summary("ZZZ")
+    assert summary["Rows"] == 0
+    assert all(np.isnan(value) for key, value in summary.items() if key != "Rows")
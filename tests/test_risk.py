@@ -0,0 +1,110 @@
+"""core.risk against a per-group pandas reference over the same panel."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.risk import RISK_COLUMNS, ROLLING_WINDOW, TRADING_DAYS, daily_returns, risk_metrics
+
+
+def daily_panel(seed=0, tickers=6, days=320):
+    """(Ticker, Date)-sorted panel over two years with missing prices and caps."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2021-10-01", periods=days)
+    frames = []
+    for i in range(tickers):
+        # Mã niêm yết muộn, mã rất ngắn
+        start = int(rng.integers(0, days // 2)) if i % 3 == 1 else 0
+        n = 1 if i == tickers - 1 else days - start
+        price = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        price[rng.random(n) < 0.15] = np.nan
+        cap = price * rng.uniform(1e6, 5e6) * rng.uniform(0.95, 1.05, n)
+        cap[rng.random(n) < 0.1] = np.nan
+        frames.append(pd.DataFrame({
+            "Ticker": f"T{i}", "Date": dates[start:start + n], "Price": price, "MarketCap": cap,
+        }))
+    panel = pd.concat(frames, ignore_index=True)
+    panel["Year"] = panel["Date"].dt.year.astype("int16")
+    return panel
+
+
+def reference(panel):
+    """Risk metrics per (Ticker, Year), computed group by group with pandas."""
+    df = panel.reset_index(drop=True)
+    # Dòng có giá gần nhất trước mỗi dòng, trong cùng mã
+    priced_row = pd.Series(np.arange(len(df)), dtype="float64").where(df["Price"].notna())
+    base = priced_row.groupby(df["Ticker"]).transform(lambda s: s.ffill().shift())
+    has_base = base.notna() & df["Price"].notna()
+    base_row = base[has_base].astype(int).to_numpy()
+    df["ret"] = np.nan
+    df.loc[has_base, "ret"] = df.loc[has_base, "Price"].to_numpy() / df["Price"].to_numpy()[base_row] - 1
+    df["base_cap"] = np.nan
+    df.loc[has_base, "base_cap"] = df["MarketCap"].to_numpy()[base_row]
+
+    weighted = df[df["ret"].notna() & (df["base_cap"] > 0)]
+    market = (weighted["ret"] * weighted["base_cap"]).groupby(weighted["Date"]).sum() / weighted.groupby("Date")["base_cap"].sum()
+    df["market"] = df["Date"].map(market)
+    df["vol_20d"] = (
+        df.groupby("Ticker")["ret"].rolling(ROLLING_WINDOW).std().reset_index(level=0, drop=True)
+    )
+
+    rows = []
+    for (ticker, year), g in df.groupby(["Ticker", "Year"], sort=False):
+        ret = g["ret"].dropna()
+        paired = g.dropna(subset=["ret", "market"])
+        beta = np.nan
+        if len(paired) > 2 and paired["market"].var() > 0:
+            beta = paired["ret"].cov(paired["market"]) / paired["market"].var()
+        drawdown = (g["Price"] / g["Price"].cummax() - 1).min()
+        rows.append({
+            "Ticker": ticker,
+            "Year": year,
+            "Annual_Return": (1 + ret).prod() - 1 if len(ret) else np.nan,
+            "Volatility": ret.std() * np.sqrt(TRADING_DAYS) if len(ret) > 1 else np.nan,
+            "Vol_20D": g["vol_20d"].iloc[-1] * np.sqrt(TRADING_DAYS),
+            "Max_Drawdown": min(drawdown, 0.0) if pd.notna(drawdown) else np.nan,
+            "Beta": beta,
+        })
+    return pd.DataFrame(rows)
+
+
+def assert_metrics(actual, expected):
+    assert list(actual["Ticker"]) == list(expected["Ticker"])
+    assert list(actual["Year"]) == list(expected["Year"])
+    for col in RISK_COLUMNS:
+        np.testing.assert_allclose(
+            actual[col].to_numpy("float64"), expected[col].to_numpy("float64"),
+            rtol=1e-5, atol=1e-6, err_msg=col,
+        )
+
+
+def test_daily_returns_bridge_missing_prices():
+    price = np.array([10, np.nan, 20, 20, np.nan, 5, 8, np.nan, 4])
+    ticker = np.array([0, 0, 0, 0, 0, 0, 1, 1, 1])
+    expected = [np.nan, np.nan, 1.0, 0.0, np.nan, -0.75, np.nan, np.nan, -0.5]
+    np.testing.assert_allclose(daily_returns(price, ticker), expected)
+
+
+def test_annual_return_across_a_gap():
+    panel = pd.DataFrame({
+        "Ticker": "AAA",
+        "Date": pd.bdate_range("2024-01-02", periods=5),
+        "Price": [10, np.nan, 20, 20, np.nan],
+        "MarketCap": 1e9,
+    })
+    panel["Year"] = panel["Date"].dt.year.astype("int16")
+    metrics = risk_metrics(panel)
+    assert metrics["Annual_Return"].iloc[0] == pytest.approx(1.0)
+    assert metrics["Volatility"].iloc[0] == pytest.approx(np.std([1.0, 0.0], ddof=1) * np.sqrt(TRADING_DAYS))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_risk_metrics_match_pandas(seed):
+    panel = daily_panel(seed)
+    assert_metrics(risk_metrics(panel), reference(panel))
+
+
+def test_risk_metrics_empty_panel():
+    panel = daily_panel().iloc[:0]
+    metrics = risk_metrics(panel)
+    assert metrics.empty
+    assert list(metrics.columns) == ["Ticker", "Year", *RISK_COLUMNS]
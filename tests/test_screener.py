@@ -0,0 +1,150 @@
+"""core.screener against brute-force pandas masks over the same table."""
+import operator
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.screener import ScreenIndex, parse_query
+
+RATINGS = ["AAA", "AA", "A", "BBB", "BB", "B"]
+INDUSTRIES = ["Bất động sản", "Ngân hàng", "Thực phẩm", "Xây dựng"]
+NUMERIC = ["ROA", "Debt to Asset", "Net Increase in Cash", "Revenue Growth"]
+COMPARE = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq}
+
+
+def health_table(seed=0, n=600):
+    """Health-like table: float32/float64 metrics, categoricals, a flag, NaN everywhere."""
+    rng = np.random.default_rng(seed)
+
+    def with_nan(values, share=0.1):
+        values = values.astype("float64")
+        values[rng.random(n) < share] = np.nan
+        return values
+
+    df = pd.DataFrame({
+        "Ticker": [f"T{i % 150:03d}" for i in range(n)],
+        "Year": rng.choice([2021, 2022, 2023, 2024], n).astype("int16"),
+        "Ngành": pd.Categorical(rng.choice([*INDUSTRIES, None], n)),
+        "Credit_Rating_Z": pd.Categorical(rng.choice([*RATINGS, None], n), categories=RATINGS),
+        # Giá trị lặp lại để có điểm bằng nhau ở ngưỡng
+        "ROA": with_nan(rng.integers(-10, 20, n) / 100).astype("float32"),
+        "Debt to Asset": with_nan(rng.uniform(0, 1, n)),
+        "Net Increase in Cash": with_nan(rng.normal(0, 1e9, n)),
+        "Revenue Growth": with_nan(rng.normal(0.05, 0.3, n), share=0.3),
+        "Warn_Loss": rng.random(n) < 0.2,
+    })
+    return df
+
+
+def brute_force(df, clauses, years=None):
+    """Rows of `df` matching every clause, evaluated column by column with pandas."""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in clauses:
+        s = df[column]
+        if op == "in":
+            mask &= s.isin(value)
+        elif op == "!=":
+            mask &= s.notna() & (s != value)
+        else:
+            mask &= COMPARE[op](s, value)
+    if years is not None:
+        mask &= df["Year"].isin(years)
+    return df[mask]
+
+
+def keys(df):
+    return sorted(zip(df["Ticker"].astype(str), df["Year"].astype(int)))
+
+
+def random_query(rng, df):
+    parts = []
+    for _ in range(rng.integers(1, 5)):
+        kind = rng.random()
+        if kind < 0.55:
+            column = rng.choice(NUMERIC)
+            op = rng.choice([">", ">=", "<", "<=", "==", "!="])
+            values = df[column].dropna()
+            # Ngưỡng lấy từ dữ liệu (trùng giá trị) hoặc ngẫu nhiên
+            value = values.iloc[rng.integers(len(values))] if rng.random() < 0.7 else rng.normal()
+            parts.append(f"{column} {op} {float(value)!r}")
+        elif kind < 0.7:
+            parts.append(f"Year {rng.choice(['>', '>=', '<', '==', '!='])} {rng.choice([2021, 2022, 2023, 2024])}")
+        elif kind < 0.8:
+            parts.append(f"Warn_Loss == {rng.choice(['0', '1', 'true', 'false'])}")
+        else:
+            column, choices = (("Credit_Rating_Z", RATINGS) if rng.random() < 0.5 else ("Ngành", INDUSTRIES))
+            if rng.random() < 0.5:
+                parts.append(f"{column} in {', '.join(rng.choice(choices, 2, replace=False))}")
+            else:
+                parts.append(f"{column} {rng.choice(['==', '=', '!='])} {rng.choice(choices)}")
+    return " and ".join(parts)
+
+
+def test_parse_query_types_values():
+    columns = dict(health_table().items())
+    assert parse_query("ROA > 0.05 and Credit_Rating_Z in AAA, AA and Warn_Loss = 1", columns) == [
+        ("ROA", ">", 0.05),
+        ("Credit_Rating_Z", "in", ["AAA", "AA"]),
+        ("Warn_Loss", "==", True),
+    ]
+    assert parse_query("  Ngành != Ngân hàng AND Year>=2023 ", columns) == [
+        ("Ngành", "!=", "Ngân hàng"),
+        ("Year", ">=", 2023.0),
+    ]
+
+
+def test_parse_query_column_names_with_keywords():
+    # "in" trong tên cột không phải toán tử
+    columns = dict(health_table().items())
+    assert parse_query("Net Increase in Cash > 0", columns) == [("Net Increase in Cash", ">", 0.0)]
+    assert parse_query("Debt to Asset <= -1e-3", columns) == [("Debt to Asset", "<=", -0.001)]
+
+
+@pytest.mark.parametrize("text", [
+    "Unknown > 1",
+    "ROA ~ 1",
+    "ROA > abc",
+    "ROA in 1, 2",
+    "Credit_Rating_Z > AA",
+])
+def test_parse_query_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_query(text, dict(health_table().items()))
+
+
+def test_query_matches_pandas():
+    rng = np.random.default_rng(1)
+    df = health_table()
+    index = ScreenIndex(df)
+    for _ in range(300):
+        text = random_query(rng, df)
+        expected = brute_force(df, parse_query(text, index.columns))
+        result = index.query(text)
+        assert keys(result) == keys(expected), text
+        # Kết quả theo thứ tự Year
+        assert result["Year"].is_monotonic_increasing
+
+
+def test_query_restricted_to_years():
+    rng = np.random.default_rng(2)
+    df = health_table(seed=3)
+    index = ScreenIndex(df)
+    for years in ([2022], [2021, 2024], []):
+        for _ in range(30):
+            text = random_query(rng, df)
+            expected = brute_force(df, parse_query(text, index.columns), years)
+            assert keys(index.query(text, years)) == keys(expected), (text, years)
+
+
+def test_query_empty_text_and_no_match():
+    df = health_table()
+    index = ScreenIndex(df)
+    assert len(index.query("")) == len(df)
+    assert index.query("ROA > 100").empty
+    assert list(index.query("ROA > 100").columns) == list(index.frame.columns)
+
+
+def test_metrics_are_numeric_columns():
+    index = ScreenIndex(health_table())
+    assert index.metrics == NUMERIC
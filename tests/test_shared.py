@@ -0,0 +1,73 @@
+"""core.shared: Arrow files written once, mapped back unchanged."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import shared
+
+
+@pytest.fixture(autouse=True)
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "SHARED_DIR", tmp_path)
+    monkeypatch.setattr(shared, "ENABLED", True)
+    return tmp_path
+
+
+def table(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(1, 100, n).astype("float32")
+    price[rng.random(n) < 0.2] = np.nan
+    return pd.DataFrame({
+        "Ticker": pd.Categorical(rng.choice(["AAA", "BBB", "CCC"], n)),
+        "Date": pd.date_range("2021-01-01", periods=n, freq="D").as_unit("us"),
+        "Year": np.full(n, 2021, dtype="int16"),
+        "Price": price,
+        "MarketCap": rng.uniform(1e9, 1e13, n).round(),
+        "Name": pd.Series([f"Công ty {i}" for i in range(n)], dtype="str"),
+        "Flag": rng.random(n) < 0.5,
+    })
+
+
+def test_round_trip_keeps_values_and_dtypes():
+    df = table()
+    shared.write_table(df, "t", ("fp", 1))
+    mapped = shared.read_table("t", ("fp", 1))
+    pd.testing.assert_frame_equal(mapped, df)
+
+
+def test_nan_is_stored_as_a_value():
+    arrow = shared.to_arrow(table())
+    assert arrow.column("Price").null_count == 0
+    assert arrow.column("MarketCap").type == "double"
+
+
+def test_stale_or_missing_file_is_not_read():
+    shared.write_table(table(), "t", ("fp", 1))
+    assert shared.read_table("t", ("fp", 2)) is None
+    assert shared.read_table("other", ("fp", 1)) is None
+
+
+def test_shared_table_builds_once_per_fingerprint():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return table(seed=len(calls))
+
+    first = shared.shared_table("t", "a", build)
+    again = shared.shared_table("t", "a", build)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(again, first)
+
+    changed = shared.shared_table("t", "b", build)
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(changed, table(seed=2))
+
+
+def test_disabled_sharing_always_builds(monkeypatch, shared_dir):
+    monkeypatch.setattr(shared, "ENABLED", False)
+    calls = []
+    for _ in range(2):
+        shared.shared_table("t", "a", lambda: calls.append(1) or table())
+    assert len(calls) == 2
+    assert not list(shared_dir.iterdir())